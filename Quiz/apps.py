@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class QuizConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Quiz'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,65 @@
+"""
+Per-object cache for the quiz and question detail endpoints.
+
+Each object has a version counter in Django's cache, bumped (by the signals in
+``Quiz.signals``, once the writing transaction commits) whenever the object or
+anything its detail payload shows changes. Serialized payloads are cached under the current version, so a bump
+makes the old entry unreachable without deleting it. The version and the
+object's ``created_at`` make up the ETag; the time of the last bump is the
+``Last-Modified`` date.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+TIMEOUT = getattr(settings, 'DETAIL_CACHE_SECONDS', 300)
+
+
+def _version_key(kind, pk):
+    return f'detail-version:{kind}:{pk}'
+
+
+def _modified_key(kind, pk):
+    return f'detail-modified:{kind}:{pk}'
+
+
+def invalidate(kind, pk):
+    """Call when an object, or anything its detail payload includes, changes."""
+    version_key = _version_key(kind, pk)
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        cache.set(version_key, time.time_ns() // 1000, timeout=None)
+    cache.set(_modified_key(kind, pk), time.time(), timeout=None)
+
+
+def _version(kind, pk):
+    version_key, modified_key = _version_key(kind, pk), _modified_key(kind, pk)
+    current = cache.get_many([version_key, modified_key])
+    if version_key not in current:
+        # Counters start from the clock, so losing them (cache restart, eviction)
+        # never hands out an ETag or date that an older payload already had.
+        cache.add(modified_key, time.time(), timeout=None)
+        cache.add(version_key, time.time_ns() // 1000, timeout=None)
+        current = cache.get_many([version_key, modified_key])
+    return current.get(version_key, 0), current.get(modified_key, 0)
+
+
+def fetch(kind, pk, load):
+    """
+    Return ``(data, etag, last_modified)`` for an object's detail payload.
+
+    ``load(pk)`` runs on a miss and returns ``(data, created_at)``; it should raise
+    ``Http404`` for a missing object. ``last_modified`` is a Unix timestamp.
+    """
+    version, modified = _version(kind, pk)
+    entry_key = f'detail:{kind}:{pk}:{version}'
+    entry = cache.get(entry_key)
+    if entry is None:
+        data, created_at = load(pk)
+        created = created_at.timestamp()
+        etag = f'"{int(created * 1e6):x}-{version:x}"'
+        entry = (data, etag, int(max(created, modified)))
+        cache.set(entry_key, entry, TIMEOUT)
+    return entry
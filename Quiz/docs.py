@@ -0,0 +1,13 @@
+"""
+drf_yasg hooks that cost nothing when API docs are disabled.
+
+Importing drf_yasg pulls in its whole schema machinery, so views decorate through
+this module and only touch drf_yasg when settings.API_DOCS_ENABLED is set.
+"""
+from django.conf import settings
+
+if getattr(settings, 'API_DOCS_ENABLED', True):
+    from drf_yasg.utils import swagger_auto_schema
+else:
+    def swagger_auto_schema(*args, **kwargs):
+        return lambda view: view
@@ -0,0 +1,286 @@
+"""
+Timed exam sessions.
+
+Clients autosave every few seconds, so autosaves never write to the database
+directly: the session row is kept in a bounded in-process store, answers are
+merged into it, and every FLUSH_SECONDS the sessions that changed are written
+back with one bulk UPDATE. Deadlines are checked against the server clock on
+every autosave and submit. Sessions nobody submitted are graded in bulk by the
+``finalize_expired_sessions`` management command.
+
+The store lives in the worker process: requests for a session should be routed
+to the worker that started it (sticky sessions). Pending autosaves are flushed
+by a background thread every FLUSH_SECONDS, which the worker starts when it first
+holds a session, as well as on session requests, when a session is evicted and
+at exit; ``EXAM_SESSION_FLUSH_SECONDS = 0`` writes every autosave through.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+
+from . import grading, leaderboard
+from .models import ExamSession
+
+DEFAULT_SECONDS = getattr(settings, 'EXAM_SESSION_SECONDS', 3600)
+FLUSH_SECONDS = getattr(settings, 'EXAM_SESSION_FLUSH_SECONDS', 5)
+STORE_SIZE = getattr(settings, 'EXAM_SESSION_STORE_SIZE', 10000)
+# The sweeper leaves sessions alone this long past their deadline, so autosaves
+# accepted just before it have been flushed by the worker holding them.
+SWEEP_GRACE_SECONDS = getattr(settings, 'EXAM_SESSION_SWEEP_GRACE_SECONDS', 30)
+# Without it, autosaves only reach the database when a later session request
+# hits the same worker, which may never happen once an exam is over.
+FLUSH_IN_BACKGROUND = getattr(settings, 'EXAM_SESSION_BACKGROUND_FLUSH', True)
+
+logger = logging.getLogger(__name__)
+
+
+class SessionClosed(Exception):
+    """The session was already submitted, or its deadline has passed."""
+
+
+class SessionStore:
+    """LRU of active ``ExamSession`` rows by id; changed rows are tracked until flushed."""
+
+    def __init__(self, max_size):
+        self.max_size = max(1, max_size)
+        self.lock = threading.RLock()
+        self._sessions = OrderedDict()
+        self._dirty = set()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, session_id):
+        with self.lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def add(self, session):
+        """Keep ``session``; returns evicted sessions that still had unflushed changes."""
+        evicted = []
+        with self.lock:
+            self._sessions[session.id] = session
+            self._sessions.move_to_end(session.id)
+            while len(self._sessions) > self.max_size:
+                old_id, old = self._sessions.popitem(last=False)
+                if old_id in self._dirty:
+                    self._dirty.discard(old_id)
+                    evicted.append(old)
+        return evicted
+
+    def mark_dirty(self, session):
+        with self.lock:
+            if session.id in self._sessions:
+                self._dirty.add(session.id)
+
+    def discard(self, session_id):
+        with self.lock:
+            self._sessions.pop(session_id, None)
+            self._dirty.discard(session_id)
+
+    def take_dirty(self):
+        """Return and clear the sessions changed since the last flush."""
+        with self.lock:
+            dirty = [self._sessions[session_id] for session_id in self._dirty]
+            self._dirty.clear()
+            return dirty
+
+    def clear(self):
+        with self.lock:
+            self._sessions.clear()
+            self._dirty.clear()
+
+
+_store = SessionStore(STORE_SIZE)
+_last_flush = time.monotonic()
+
+
+# ---------------- FLUSHING ----------------
+def _write(sessions):
+    if sessions:
+        ExamSession.objects.bulk_update(sessions, ['answers', 'saved_at'], batch_size=500)
+
+
+def flush():
+    """Write every session autosaved since the last flush with one bulk UPDATE."""
+    global _last_flush
+    _last_flush = time.monotonic()
+    with _store.lock:
+        dirty = _store.take_dirty()
+        # Snapshots, so autosaves can keep landing while the UPDATE runs.
+        pending = [ExamSession(id=s.id, answers=dict(s.answers), saved_at=s.saved_at) for s in dirty]
+    try:
+        _write(pending)
+    except Exception:
+        for session in dirty:
+            _store.mark_dirty(session)
+        raise
+    return len(pending)
+
+
+def maybe_flush():
+    if time.monotonic() - _last_flush >= FLUSH_SECONDS:
+        flush()
+
+
+atexit.register(flush)
+
+_flusher = None
+_flusher_lock = threading.Lock()
+
+
+def _flush_periodically():
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        close_old_connections()
+        try:
+            flush()
+        except Exception:
+            logger.exception("Flushing exam session autosaves failed; retrying in %s s.", FLUSH_SECONDS)
+
+
+def start_flusher():
+    """Start this process's background flusher unless it is running (or disabled)."""
+    global _flusher
+    if not FLUSH_IN_BACKGROUND or FLUSH_SECONDS <= 0:
+        return
+    with _flusher_lock:
+        # A forked worker inherits the reference but not the thread.
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_flush_periodically, name='exam-session-flusher', daemon=True)
+            _flusher.start()
+
+
+# ---------------- SESSIONS ----------------
+def _hold(session):
+    """Keep an active session in the store, writing out any it evicts."""
+    _write(_store.add(session))
+    start_flusher()
+
+
+def start(quiz):
+    """Open a session for ``quiz``; it closes ``quiz.time_limit`` seconds from now."""
+    seconds = quiz.time_limit or DEFAULT_SECONDS
+    session = ExamSession.objects.create(quiz_id=quiz.id, deadline=timezone.now() + timedelta(seconds=seconds))
+    _hold(session)
+    return session
+
+
+def get_session(session_id):
+    """The session with its latest answers: from the store when it is held here."""
+    session = _store.get(session_id)
+    if session is None:
+        session = get_object_or_404(ExamSession, pk=session_id)
+        if session.status == ExamSession.ACTIVE:
+            _hold(session)
+    maybe_flush()
+    return session
+
+
+def _merge(session, answers):
+    """Validate a submit-style answers payload against the quiz's key and merge it in."""
+    key = grading.get_answer_key(session.quiz_id)
+    updates = {}
+    for ans in answers:
+        question = key.question(ans.get('question'))
+        if question is None:
+            raise Http404("No Question matches the given query.")
+        updates[question.id] = {
+            'selected_options': [str(option_id) for option_id in ans.get('selected_options') or []],
+            'text_answer': (ans.get('text_answer') or '')[:300],
+        }
+    with _store.lock:
+        session.answers.update(updates)
+        session.saved_at = timezone.now()
+    return len(updates)
+
+
+def autosave(session_id, answers):
+    """Merge answers into an active session; they reach the database at the next flush."""
+    session = get_session(session_id)
+    if session.status != ExamSession.ACTIVE:
+        raise SessionClosed("This session has already been submitted.")
+    if timezone.now() >= session.deadline:
+        raise SessionClosed("Time is up for this session.")
+    saved = _merge(session, answers)
+    _store.mark_dirty(session)
+    maybe_flush()
+    return session, saved
+
+
+def _finalize(sessions, status):
+    """Grade sessions' answers and write submissions and sessions with bulk statements."""
+    keys = {}
+    pairs = []
+    for session in sessions:
+        key = keys.get(session.quiz_id)
+        if key is None:
+            key = keys[session.quiz_id] = grading.get_answer_key(session.quiz_id)
+        # Questions unlinked from the quiz since they were answered no longer count.
+        answers = [
+            {'question': question_id, **answer}
+            for question_id, answer in session.answers.items()
+            if question_id in key.questions
+        ]
+        pairs.append((session.quiz_id, key.grade(answers)))
+
+    submissions = grading.save_submissions(pairs)
+    for session, submission in zip(sessions, submissions):
+        session.status = status
+        session.submission = submission
+    ExamSession.objects.bulk_update(sessions, ['status', 'answers', 'saved_at', 'submission'], batch_size=500)
+    for session in sessions:
+        _store.discard(session.id)
+    return submissions
+
+
+def submit(session_id, answers=None):
+    """
+    Submit a session, merging any final answers first. After the deadline only the
+    answers saved in time are graded and the session is marked expired.
+    Returns ``(session, submission)``.
+    """
+    with transaction.atomic():
+        row = get_object_or_404(ExamSession.objects.select_for_update(), pk=session_id)
+        if row.status != ExamSession.ACTIVE:
+            _store.discard(row.id)
+            raise SessionClosed("This session has already been submitted.")
+        session = _store.get(row.id) or row
+        on_time = timezone.now() < session.deadline
+        if answers and on_time:
+            _merge(session, answers)
+        submission = _finalize([session], ExamSession.SUBMITTED if on_time else ExamSession.EXPIRED)[0]
+    leaderboard.update_boards([submission])
+    return session, submission
+
+
+def finalize_expired(batch_size=500, grace=None):
+    """Grade active sessions whose deadline passed ``grace`` seconds ago; returns how many."""
+    flush()
+    grace = SWEEP_GRACE_SECONDS if grace is None else grace
+    cutoff = timezone.now() - timedelta(seconds=grace)
+    finalized = 0
+    while True:
+        with transaction.atomic():
+            # skip_locked lets several sweepers (or a racing submit) share the work.
+            batch = list(
+                ExamSession.objects.select_for_update(skip_locked=True)
+                .filter(status=ExamSession.ACTIVE, deadline__lte=cutoff)
+                .order_by('deadline')[:batch_size]
+            )
+            if not batch:
+                return finalized
+            submissions = _finalize(batch, ExamSession.EXPIRED)
+        leaderboard.update_boards(submissions)
+        finalized += len(batch)
@@ -0,0 +1,395 @@
+"""
+Grading engine.
+
+A question bank's answer key is compiled once into plain Python tables
+(``AnswerKey``), cached per process, and shared by every quiz linking to that
+bank; a quiz's key is just the subset of bank questions it links to. Whole
+submissions are graded without touching the database. How a question turns a
+selection into points is decided by a pluggable strategy chosen from
+``Question.scoring`` (choice questions) or the question type (text questions).
+"""
+import threading
+import time
+from uuid import UUID
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+
+from .text_matching import TextMatcher
+
+
+# ---------------- STRATEGIES ----------------
+class ExactStrategy:
+    """All-or-nothing: full marks only when the selection equals the correct set."""
+
+    name = 'exact'
+
+    def score(self, key, selected, text):
+        if selected == key.correct:
+            return key.marks
+        return key.floor if selected else 0.0
+
+
+class PartialCreditStrategy:
+    """Sum of per-option points, clamped between the negative-marking floor and full marks."""
+
+    name = 'partial'
+
+    def score(self, key, selected, text):
+        weights = key.weights
+        points = 0.0
+        for option_id in selected:
+            points += weights[option_id]
+        if points > key.marks:
+            return key.marks
+        return key.floor if points < key.floor else points
+
+
+class TextStrategy:
+    """Marks times the weight of the best matching accepted answer; unmatched answers get the floor."""
+
+    name = 'text'
+
+    def score(self, key, selected, text):
+        if not key.matcher or not text:
+            return 0.0
+        weight = key.matcher.match(text)
+        if weight is None:
+            return key.floor
+        return key.marks * weight
+
+
+STRATEGIES = {}
+
+
+def register_strategy(strategy):
+    """Make a strategy available to questions whose ``scoring`` equals ``strategy.name``."""
+    STRATEGIES[strategy.name] = strategy
+    return strategy
+
+
+for _strategy in (ExactStrategy(), PartialCreditStrategy(), TextStrategy()):
+    register_strategy(_strategy)
+
+
+# ---------------- ANSWER KEYS ----------------
+class QuestionKey:
+    """Precomputed scoring table for one question."""
+
+    __slots__ = ('id', 'type', 'marks', 'floor', 'strategy', 'options', 'correct', 'weights', 'matcher')
+
+    def __init__(self, id, type, marks, negative_marks, scoring, options, accepted=(), fuzzy_distance=0):
+        """
+        ``options`` is an iterable of ``(option_id, is_correct, weight)`` with string ids;
+        ``accepted`` holds a text question's ``(text, is_regex, weight)`` accepted answers.
+        """
+        from .models import Question
+
+        self.id = id
+        self.type = type
+        self.marks = float(marks)
+        self.floor = -float(negative_marks or 0)
+        self.strategy = STRATEGIES[Question.TEXT if type == Question.TEXT else scoring]
+        options = list(options)
+        self.options = frozenset(option_id for option_id, _, _ in options)
+        self.correct = frozenset(option_id for option_id, is_correct, _ in options if is_correct)
+
+        # Option weights are fractions of the question's marks. Unweighted options
+        # split the marks evenly across the correct answers and cost the same
+        # amount when picked wrongly, so selecting everything nets zero.
+        share = 1.0 / len(self.correct) if self.correct else 0.0
+        self.weights = {
+            option_id: self.marks * (weight if weight is not None else (share if is_correct else -share))
+            for option_id, is_correct, weight in options
+        }
+        self.matcher = TextMatcher(accepted, fuzzy_distance) if type == Question.TEXT else None
+
+    def grade(self, selected, text=''):
+        return self.strategy.score(self, selected, text)
+
+
+class GradedAnswer:
+    __slots__ = ('question', 'selected', 'text', 'points')
+
+    def __init__(self, question, selected, text, points):
+        self.question = question
+        self.selected = selected
+        self.text = text
+        self.points = points
+
+
+class GradedSubmission:
+    __slots__ = ('score', 'total', 'answers')
+
+    def __init__(self, score, total, answers):
+        self.score = score
+        self.total = total
+        self.answers = answers
+
+
+def _canonical_uuid(value):
+    try:
+        return str(UUID(str(value)))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+class AnswerKey:
+    """Compiled answer key for a quiz: question id (str) -> ``QuestionKey``."""
+
+    __slots__ = ('questions', 'total')
+
+    def __init__(self, question_keys):
+        self.questions = {key.id: key for key in question_keys}
+        self.total = sum(key.marks for key in self.questions.values())
+
+    @classmethod
+    def from_rows(cls, question_rows, option_rows, accepted_rows=()):
+        """
+        Build a key from ``(id, type, marks, negative_marks, scoring, fuzzy_distance)``
+        question rows, ``(id, question_id, is_correct, weight)`` option rows and
+        ``(question_id, text, is_regex, weight)`` accepted-answer rows.
+        """
+        options_by_question = {}
+        for option_id, question_id, is_correct, weight in option_rows:
+            options_by_question.setdefault(str(question_id), []).append((str(option_id), is_correct, weight))
+        accepted_by_question = {}
+        for question_id, text, is_regex, weight in accepted_rows:
+            accepted_by_question.setdefault(str(question_id), []).append((text, is_regex, weight))
+        return cls(
+            QuestionKey(
+                str(qid), q_type, marks, negative_marks, scoring,
+                options_by_question.get(str(qid), ()), accepted_by_question.get(str(qid), ()), fuzzy_distance,
+            )
+            for qid, q_type, marks, negative_marks, scoring, fuzzy_distance in question_rows
+        )
+
+    def subset(self, question_ids):
+        """A key restricted to ``question_ids`` that shares this key's compiled questions."""
+        questions = self.questions
+        return AnswerKey(questions[qid] for qid in question_ids if qid in questions)
+
+    def question(self, question_id):
+        key = self.questions.get(question_id)
+        if key is None and question_id is not None:
+            key = self.questions.get(_canonical_uuid(question_id))
+        return key
+
+    def grade(self, answers):
+        """
+        Grade a submit payload (``[{"question", "selected_options", "text_answer"}, ...]``).
+
+        Unknown question ids raise ``Http404``; option ids that are malformed or
+        belong to another question are ignored. Repeated answers to the same
+        question only count once.
+        """
+        questions = self.questions
+        graded = []
+        seen = set()
+        score = 0.0
+        empty = frozenset()
+        for ans in answers:
+            key = questions.get(ans.get('question')) or self.question(ans.get('question'))
+            if key is None:
+                raise Http404("No Question matches the given query.")
+            if key in seen:
+                continue
+            seen.add(key)
+
+            options = key.options
+            if options:
+                selected = frozenset(ans.get('selected_options') or empty)
+                if not selected <= options:
+                    selected = frozenset(
+                        option_id for option_id in map(_canonical_uuid, selected) if option_id in options
+                    )
+                text = ''
+            else:
+                selected = empty
+                text = (ans.get('text_answer') or '')[:300]
+
+            points = key.strategy.score(key, selected, text)
+            score += points
+            graded.append(GradedAnswer(key, selected, text, points))
+        return GradedSubmission(round(score, 4), self.total, graded)
+
+
+# ---------------- CACHE ----------------
+# Compiled keys live in this process; their version counters live in Django's
+# cache so that, with a shared cache backend, an edit in one worker invalidates
+# the compiled keys held by all of them.
+_bank_keys = {}
+_quiz_keys = {}
+_keys_lock = threading.Lock()
+
+# Compiled keys are rebuilt at least this often, so that a worker whose cache
+# is not shared with the others still picks up their edits eventually.
+MAX_AGE_SECONDS = getattr(settings, 'ANSWER_KEY_MAX_AGE', 300)
+
+
+def _fresh(compiled_at):
+    return time.monotonic() - compiled_at < MAX_AGE_SECONDS
+
+
+def _bank_version_key(bank_id):
+    return f'answer-key-version:bank:{bank_id}'
+
+
+def _quiz_version_key(quiz_id):
+    return f'answer-key-version:quiz:{quiz_id}'
+
+
+def _bump(version_key):
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        cache.set(version_key, 1, timeout=None)
+
+
+def compile_bank_key(bank_id):
+    from .models import AcceptedAnswer, Option, Question
+
+    question_rows = Question.objects.filter(bank_id=bank_id).values_list(
+        'id', 'type', 'marks', 'negative_marks', 'scoring', 'fuzzy_distance'
+    )
+    option_rows = Option.objects.filter(question__bank_id=bank_id).values_list(
+        'id', 'question_id', 'is_correct', 'weight'
+    )
+    accepted_rows = AcceptedAnswer.objects.filter(question__bank_id=bank_id).values_list(
+        'question_id', 'text', 'is_regex', 'weight'
+    )
+    return AnswerKey.from_rows(question_rows, option_rows, accepted_rows)
+
+
+def _bank_entry(bank_id):
+    version = cache.get(_bank_version_key(bank_id), 0)
+    cached = _bank_keys.get(bank_id)
+    if cached is not None and cached[0] == version and _fresh(cached[2]):
+        return cached
+    cached = (version, compile_bank_key(bank_id), time.monotonic())
+    with _keys_lock:
+        _bank_keys[bank_id] = cached
+    return cached
+
+
+def get_bank_key(bank_id):
+    """Return ``(version, key)`` for every question in a bank."""
+    return _bank_entry(bank_id)[:2]
+
+
+def compile_answer_key(quiz_id, fresh=False):
+    """
+    Return ``(key, bank_versions)`` for the questions a quiz links to. ``fresh``
+    recompiles the banks from the database instead of using the cached bank keys.
+    """
+    key, bank_versions, _ = _compile_answer_key(quiz_id, fresh)
+    return key, bank_versions
+
+
+def _compile_answer_key(quiz_id, fresh):
+    """``compile_answer_key`` plus when the oldest bank key it used was compiled."""
+    from .models import QuizQuestion
+
+    links = QuizQuestion.objects.filter(quiz_id=quiz_id).values_list('question_id', 'question__bank_id')
+    by_bank = {}
+    for question_id, bank_id in links:
+        by_bank.setdefault(bank_id, []).append(str(question_id))
+
+    questions = []
+    bank_versions = {}
+    compiled_at = time.monotonic()
+    for bank_id, question_ids in by_bank.items():
+        if fresh:
+            version, bank_key = cache.get(_bank_version_key(bank_id), 0), compile_bank_key(bank_id)
+        else:
+            version, bank_key, bank_compiled_at = _bank_entry(bank_id)
+            compiled_at = min(compiled_at, bank_compiled_at)
+        bank_versions[_bank_version_key(bank_id)] = version
+        questions.extend(bank_key.subset(question_ids).questions.values())
+    return AnswerKey(questions), bank_versions, compiled_at
+
+
+def get_answer_key(quiz_id):
+    """
+    Return the compiled key for a quiz. It is rebuilt (cheaply, from the cached
+    bank keys) when the quiz's links or any of its banks change.
+    """
+    cached = _quiz_keys.get(quiz_id)
+    version = cache.get(_quiz_version_key(quiz_id), 0)
+    if cached is not None and cached[0] == version and _fresh(cached[3]):
+        bank_versions = cached[1]
+        current = cache.get_many(list(bank_versions))
+        if all(current.get(vkey, 0) == v for vkey, v in bank_versions.items()):
+            return cached[2]
+    key, bank_versions, compiled_at = _compile_answer_key(quiz_id, fresh=False)
+    with _keys_lock:
+        _quiz_keys[quiz_id] = (version, bank_versions, key, compiled_at)
+    return key
+
+
+def invalidate_bank_key(bank_id):
+    """Call when a bank's questions, options or accepted answers change."""
+    with _keys_lock:
+        _bank_keys.pop(bank_id, None)
+    _bump(_bank_version_key(bank_id))
+
+
+def invalidate_quiz_key(quiz_id):
+    """Call when a quiz's question links change."""
+    with _keys_lock:
+        _quiz_keys.pop(quiz_id, None)
+    _bump(_quiz_version_key(quiz_id))
+
+
+# ---------------- PERSISTENCE ----------------
+def save_submissions(graded_submissions):
+    """
+    Write ``(quiz_id, GradedSubmission)`` pairs with one bulk insert per table,
+    however many submissions and answers there are. Their leaderboard entries
+    are written in the same transaction; put them on the loaded boards with
+    ``leaderboard.update_boards`` once it has committed. Returns the Submission rows.
+    """
+    from .models import LeaderboardEntry, Submission, SubmissionAnswer
+
+    SelectedOption = SubmissionAnswer.selected_options.through
+    submissions = []
+    rows = []
+    links = []
+    for quiz_id, graded in graded_submissions:
+        submission = Submission(quiz_id=quiz_id, score=graded.score, total=graded.total)
+        submissions.append(submission)
+        for answer in graded.answers:
+            row = SubmissionAnswer(submission=submission, question_id=answer.question.id, text_answer=answer.text)
+            rows.append(row)
+            links.extend(
+                SelectedOption(submissionanswer_id=row.id, option_id=option_id) for option_id in answer.selected
+            )
+    with transaction.atomic():
+        Submission.objects.bulk_create(submissions)
+        SubmissionAnswer.objects.bulk_create(rows, batch_size=1000)
+        SelectedOption.objects.bulk_create(links, batch_size=1000)
+        # New submissions cannot have entries yet, so a plain insert will do.
+        LeaderboardEntry.objects.bulk_create(
+            [
+                LeaderboardEntry(
+                    submission_id=submission.id,
+                    quiz_id=submission.quiz_id,
+                    score=submission.score,
+                    submitted_at=submission.submitted_at,
+                )
+                for submission in submissions
+            ],
+            batch_size=1000,
+        )
+    return submissions
+
+
+def save_submission(quiz_id, graded):
+    return save_submissions([(quiz_id, graded)])[0]
+
+
+def grade_and_save(quiz_id, answers):
+    graded = get_answer_key(quiz_id).grade(answers)
+    return save_submission(quiz_id, graded)
@@ -0,0 +1,178 @@
+"""
+Per-quiz leaderboards served from memory.
+
+Each quiz keeps a sorted list of ranking keys ``(-score, submitted_at, submission_id)``
+so the best submission sits at index 0, ties are broken by who submitted first,
+and a submission's rank is a single bisect. Boards are loaded lazily from the
+LEADERBOARD_ENTRIES table (so they survive restarts) and are updated in place
+every time a submission is graded.
+
+Submissions graded by other workers are picked up incrementally: every
+REFRESH_SECONDS a board reads only the entries submitted since its last read,
+and a rank lookup that misses loads that one entry. Rescoring changes existing
+entries, so it bumps a per-quiz version in Django's cache and every worker
+rebuilds that board from the table on its next read.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import LeaderboardEntry
+
+# How often a board reads the entries other workers added since its last read.
+REFRESH_SECONDS = getattr(settings, 'LEADERBOARD_REFRESH_SECONDS', 60)
+# Each read starts this far before the previous one, so entries whose
+# transaction committed a little after they were stamped are not skipped.
+REFRESH_OVERLAP_SECONDS = getattr(settings, 'LEADERBOARD_REFRESH_OVERLAP_SECONDS', 30)
+
+
+class QuizLeaderboard:
+    """Sorted ranking keys for a single quiz."""
+
+    def __init__(self, rows=(), version=0, read_since=None):
+        self._keys = []
+        self._by_submission = {}
+        self._lock = threading.Lock()
+        self.version = version
+        # When the last read from the table started; the next one continues from there.
+        self.read_since = read_since
+        self.loaded_at = time.monotonic()
+        for submission_id, score, submitted_at in rows:
+            key = (-score, submitted_at, submission_id)
+            self._keys.append(key)
+            self._by_submission[submission_id] = key
+        self._keys.sort()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, submission_id, score, submitted_at):
+        """Insert or re-score a submission."""
+        key = (-score, submitted_at, submission_id)
+        with self._lock:
+            old = self._by_submission.get(submission_id)
+            if old == key:
+                return
+            if old is not None:
+                del self._keys[bisect_left(self._keys, old)]
+            insort(self._keys, key)
+            self._by_submission[submission_id] = key
+
+    def remove(self, submission_id):
+        with self._lock:
+            old = self._by_submission.pop(submission_id, None)
+            if old is not None:
+                del self._keys[bisect_left(self._keys, old)]
+
+    def rank(self, submission_id):
+        """1-based rank of a submission, or None if it is not on the board."""
+        key = self._by_submission.get(submission_id)
+        if key is None:
+            return None
+        return bisect_left(self._keys, key) + 1
+
+    def top(self, limit):
+        """The best ``limit`` entries as ``(rank, submission_id, score, submitted_at)``."""
+        with self._lock:
+            head = self._keys[:limit]
+        return [
+            (position, submission_id, -neg_score, submitted_at)
+            for position, (neg_score, submitted_at, submission_id) in enumerate(head, start=1)
+        ]
+
+
+_boards = {}
+_boards_lock = threading.Lock()
+
+
+def _version_key(quiz_id):
+    return f'leaderboard-version:{quiz_id}'
+
+
+def _entries(quiz_id):
+    return LeaderboardEntry.objects.filter(quiz_id=quiz_id).values_list('submission_id', 'score', 'submitted_at')
+
+
+def _load(quiz_id, version):
+    read_since = timezone.now()
+    return QuizLeaderboard(_entries(quiz_id), version, read_since)
+
+
+def _refresh(board, quiz_id):
+    """Add the entries submitted since the board's last read (the index on quiz and submitted_at serves this)."""
+    read_since = timezone.now()
+    since = board.read_since - timedelta(seconds=REFRESH_OVERLAP_SECONDS)
+    for submission_id, score, submitted_at in _entries(quiz_id).filter(submitted_at__gte=since):
+        board.add(submission_id, score, submitted_at)
+    board.read_since = read_since
+    board.loaded_at = time.monotonic()
+
+
+def get_board(quiz_id):
+    """Return the in-memory board for a quiz, loading it from the table if needed."""
+    version = cache.get(_version_key(quiz_id), 0)
+    board = _boards.get(quiz_id)
+    if board is None or board.version != version:
+        board = _load(quiz_id, version)
+        with _boards_lock:
+            _boards[quiz_id] = board
+    elif time.monotonic() - board.loaded_at > REFRESH_SECONDS:
+        _refresh(board, quiz_id)
+    return board
+
+
+def invalidate(quiz_id=None):
+    """
+    Drop a cached board (or all of this process's boards) so the next read reloads
+    from the table. Invalidating one quiz also makes every other worker reload it.
+    """
+    with _boards_lock:
+        if quiz_id is None:
+            _boards.clear()
+        else:
+            _boards.pop(quiz_id, None)
+    if quiz_id is not None:
+        version_key = _version_key(quiz_id)
+        try:
+            cache.incr(version_key)
+        except ValueError:
+            cache.set(version_key, 1, timeout=None)
+
+
+def update_boards(submissions):
+    """
+    Put committed submissions on the boards loaded in this process. Their entries
+    are written by ``grading.save_submissions`` together with the submissions.
+    """
+    for submission in submissions:
+        board = _boards.get(submission.quiz_id)
+        if board is not None:
+            board.add(submission.id, submission.score, submission.submitted_at)
+
+
+def top(quiz_id, limit=10):
+    return get_board(quiz_id).top(limit)
+
+
+def standing(quiz_id, submission_id):
+    """
+    ``(rank, out_of)`` for a submission. A submission graded by another worker
+    since the board's last read is loaded from the table on the spot.
+    """
+    board = get_board(quiz_id)
+    position = board.rank(submission_id)
+    if position is None:
+        entry = _entries(quiz_id).filter(submission_id=submission_id).first()
+        if entry is not None:
+            board.add(*entry)
+            position = board.rank(submission_id)
+    return position, len(board)
+
+
+def rank(quiz_id, submission_id):
+    return standing(quiz_id, submission_id)[0]
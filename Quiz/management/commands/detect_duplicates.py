@@ -0,0 +1,106 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from Quiz import grading, rescoring, similarity
+from Quiz.models import Quiz, Submission, SubmissionAnswer
+
+
+class Command(BaseCommand):
+    help = (
+        "Report clusters of submissions to a quiz whose answers are identical or nearly so. "
+        "Submissions are signed the first time they are reported on (and again after a rescore "
+        "or with --resign), which regrades them: O(submissions x answers), roughly 40 s per "
+        "100k submissions. Later runs only sign new submissions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_id')
+        parser.add_argument('--threshold', type=float, default=similarity.THRESHOLD,
+                            help='minimum estimated answer-set similarity (0-1) to link two submissions')
+        parser.add_argument('--min-size', type=int, default=2, help='smallest cluster reported')
+        parser.add_argument('--limit', type=int, default=20, help='clusters listed (largest first)')
+        parser.add_argument('--json', action='store_true', help='print every cluster as JSON')
+        parser.add_argument('--resign', action='store_true',
+                            help='recompute every signature, e.g. once many more submissions have '
+                                 'changed how common each wrong answer is (slow, see above)')
+
+    def handle(self, *args, **options):
+        if not 0 < options['threshold'] <= 1:
+            raise CommandError("--threshold must be in (0, 1].")
+        quiz = Quiz.objects.filter(pk=options['quiz_id']).only('id', 'title').first()
+        if quiz is None:
+            raise CommandError(f"Quiz {options['quiz_id']} does not exist.")
+        if options['resign']:
+            Submission.objects.filter(quiz_id=quiz.id).update(answer_hash='', minhash=None)
+        signed = self.sign(quiz.id)
+        if signed:
+            self.stderr.write(f"Signed {signed} new submission(s).")
+
+        rows = Submission.objects.filter(quiz_id=quiz.id, minhash__isnull=False).values_list(
+            'id', 'answer_hash', 'minhash'
+        )
+        clusters = similarity.find_clusters(rows.iterator(chunk_size=5000), options['threshold'], options['min_size'])
+
+        if options['json']:
+            self.stdout.write(json.dumps([
+                {
+                    'size': len(cluster),
+                    'similarity': cluster.similarity,
+                    'identical': cluster.identical,
+                    'submissions': [str(submission_id) for submission_id in cluster.submissions],
+                }
+                for cluster in clusters
+            ], indent=2))
+            return
+
+        flagged = sum(len(cluster) for cluster in clusters)
+        self.stdout.write(f"{quiz.title}: {len(clusters)} cluster(s), {flagged} submission(s) flagged.")
+        for number, cluster in enumerate(clusters[:options['limit']], start=1):
+            self.stdout.write(
+                f"#{number}: {len(cluster)} submissions, similarity >= {cluster.similarity:.2f}, "
+                f"{cluster.identical} with identical answers"
+            )
+            for submission_id in cluster.submissions[:10]:
+                self.stdout.write(f"    {submission_id}")
+            if len(cluster) > 10:
+                self.stdout.write(f"    ... and {len(cluster) - 10} more")
+
+    def answer_shares(self, quiz_id):
+        """How often each option and text answer was given across the quiz's submissions."""
+        picks = SubmissionAnswer.selected_options.through.objects.filter(
+            submissionanswer__submission__quiz_id=quiz_id
+        ).values('option_id').annotate(count=Count('id')).order_by().values_list('option_id', 'count')
+        texts = SubmissionAnswer.objects.filter(submission__quiz_id=quiz_id).exclude(text_answer='').values(
+            'question_id', 'text_answer'
+        ).annotate(count=Count('id')).order_by().values_list('question_id', 'text_answer', 'count')
+        return similarity.AnswerShares(picks, texts, Submission.objects.filter(quiz_id=quiz_id).count())
+
+    def sign(self, quiz_id):
+        """Compute the signatures of submissions that have none, from the answers they got wrong."""
+        missing = Submission.objects.filter(quiz_id=quiz_id, answer_hash='')
+        if not missing.exists():
+            return 0
+        key, _ = grading.compile_answer_key(quiz_id, fresh=True)
+        shares = self.answer_shares(quiz_id)
+        updated = 0
+        after = None
+        while True:
+            page = missing.order_by('id')
+            if after is not None:
+                page = page.filter(id__gt=after)
+            ids = list(page.values_list('id', flat=True)[:rescoring.CHUNK_SIZE])
+            if not ids:
+                return updated
+            after = ids[-1]
+            rows = []
+            for submission_id, answers in rescoring.load_answers(key, ids).items():
+                answer_hash, minhash = similarity.signature((
+                    (answer.question.id, answer.selected, answer.text)
+                    for answer in key.grade(answers).answers
+                    if answer.points < answer.question.marks
+                ), shares)
+                rows.append(Submission(id=submission_id, answer_hash=answer_hash, minhash=minhash))
+            Submission.objects.bulk_update(rows, ['answer_hash', 'minhash'], batch_size=500)
+            updated += len(rows)
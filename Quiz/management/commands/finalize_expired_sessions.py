@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from Quiz import exam_sessions
+
+
+class Command(BaseCommand):
+    help = "Grade and close exam sessions whose deadline has passed without a submit."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='sessions graded and written per transaction')
+        parser.add_argument('--grace', type=int, default=None,
+                            help='seconds past the deadline to wait for pending autosaves '
+                                 f'(default {exam_sessions.SWEEP_GRACE_SECONDS})')
+
+    def handle(self, *args, **options):
+        finalized = exam_sessions.finalize_expired(batch_size=options['batch_size'], grace=options['grace'])
+        self.stdout.write(f"Finalized {finalized} expired session(s).")
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from Quiz import rescoring
+from Quiz.models import Quiz, RescoreJob
+
+
+class Command(BaseCommand):
+    help = "Regrade submissions against the current answer key, resuming interrupted jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='*', help='quizzes to rescore (resumes their unfinished job)')
+        parser.add_argument('--pending', action='store_true',
+                            help='run every queued or interrupted job (e.g. ones created through the API)')
+        parser.add_argument('--workers', type=int, default=None,
+                            help=f'grading processes (default {rescoring.WORKERS}; 1 grades in-process)')
+        parser.add_argument('--chunk-size', type=int, default=rescoring.CHUNK_SIZE,
+                            help='submissions read, graded and written per chunk')
+
+    def handle(self, *args, **options):
+        jobs = []
+        for quiz_id in options['quiz_ids']:
+            if not Quiz.objects.filter(pk=quiz_id).exists():
+                raise CommandError(f"Quiz {quiz_id} does not exist.")
+            jobs.append(rescoring.create_job(quiz_id))
+        if options['pending']:
+            jobs.extend(
+                RescoreJob.objects.filter(status__in=rescoring.UNFINISHED)
+                .exclude(pk__in=[job.pk for job in jobs]).order_by('created_at')
+            )
+        if not jobs:
+            raise CommandError("Give one or more quiz ids, or --pending.")
+
+        for job in jobs:
+            resumed = f" from checkpoint ({job.processed} done)" if job.last_submission_id else ""
+            self.stdout.write(f"Rescoring quiz {job.quiz_id}{resumed}...")
+            try:
+                job = rescoring.run(job, workers=options['workers'], chunk_size=options['chunk_size'])
+            except rescoring.JobBusy as e:
+                self.stdout.write(f"Skipped: {e}")
+                continue
+            self.stdout.write(f"Rescored {job.processed} submission(s), {job.changed} changed.")
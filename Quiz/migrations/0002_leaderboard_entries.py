@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_entries(apps, schema_editor):
+    Submission = apps.get_model('Quiz', 'Submission')
+    LeaderboardEntry = apps.get_model('Quiz', 'LeaderboardEntry')
+    rows = Submission.objects.values_list('id', 'quiz_id', 'score', 'submitted_at').iterator(chunk_size=2000)
+    batch = []
+    for submission_id, quiz_id, score, submitted_at in rows:
+        batch.append(LeaderboardEntry(
+            submission_id=submission_id, quiz_id=quiz_id, score=score, submitted_at=submitted_at,
+        ))
+        if len(batch) >= 2000:
+            LeaderboardEntry.objects.bulk_create(batch)
+            batch = []
+    LeaderboardEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Quiz', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='leaderboard_entry', serialize=False, to='Quiz.submission')),
+                ('score', models.PositiveIntegerField(default=0)),
+                ('submitted_at', models.DateTimeField()),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='Quiz.quiz')),
+            ],
+            options={
+                'db_table': 'LEADERBOARD_ENTRIES',
+                'indexes': [models.Index(fields=['quiz', '-score', 'submitted_at'], name='leaderboard_rank_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Quiz', '0002_leaderboard_entries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='option',
+            name='weight',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='negative_marks',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='scoring',
+            field=models.CharField(choices=[('exact', 'All or nothing'), ('partial', 'Partial credit')], default='exact', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='leaderboardentry',
+            name='score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='marks',
+            field=models.FloatField(default=1),
+        ),
+        migrations.AlterField(
+            model_name='submission',
+            name='score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='submission',
+            name='total',
+            field=models.FloatField(default=0),
+        ),
+    ]
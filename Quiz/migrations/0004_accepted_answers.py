@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:48
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Quiz', '0003_weighted_grading'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='fuzzy_distance',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='AcceptedAnswer',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('text', models.CharField(max_length=300)),
+                ('is_regex', models.BooleanField(default=False)),
+                ('weight', models.FloatField(default=1)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='accepted_answers', to='Quiz.question')),
+            ],
+            options={
+                'db_table': 'ACCEPTED_ANSWERS',
+            },
+        ),
+    ]
@@ -0,0 +1,82 @@
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def move_questions_into_banks(apps, schema_editor):
+    """Give every existing quiz its own bank and link its questions to it."""
+    Quiz = apps.get_model('Quiz', 'Quiz')
+    Question = apps.get_model('Quiz', 'Question')
+    QuestionBank = apps.get_model('Quiz', 'QuestionBank')
+    QuizQuestion = apps.get_model('Quiz', 'QuizQuestion')
+
+    for quiz in Quiz.objects.all().iterator():
+        bank = QuestionBank.objects.create(title=quiz.title)
+        quiz.bank = bank
+        quiz.save(update_fields=['bank'])
+        questions = Question.objects.filter(quiz=quiz)
+        QuizQuestion.objects.bulk_create(
+            QuizQuestion(quiz=quiz, question_id=question_id, order=order)
+            for question_id, order in questions.order_by('created_at').values_list('id', 'order')
+        )
+        questions.update(bank=bank)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Quiz', '0004_accepted_answers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionBank',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'QUESTION_BANKS',
+            },
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='bank',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='quizzes', to='Quiz.questionbank'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='bank',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='questions', to='Quiz.questionbank'),
+        ),
+        migrations.CreateModel(
+            name='QuizQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order', models.IntegerField(blank=True, null=True)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_links', to='Quiz.question')),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_links', to='Quiz.quiz')),
+            ],
+            options={
+                'db_table': 'QUIZ_QUESTIONS',
+                'constraints': [models.UniqueConstraint(fields=('quiz', 'question'), name='unique_quiz_question')],
+            },
+        ),
+        migrations.RunPython(move_questions_into_banks, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='question',
+            name='quiz',
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='bank',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='questions', to='Quiz.questionbank'),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='questions',
+            field=models.ManyToManyField(related_name='quizzes', through='Quiz.QuizQuestion', to='Quiz.question'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:56
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Quiz', '0005_question_banks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='time_limit',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ExamSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('active', 'In progress'), ('submitted', 'Submitted'), ('expired', 'Expired')], default='active', max_length=20)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('deadline', models.DateTimeField()),
+                ('answers', models.JSONField(blank=True, default=dict)),
+                ('saved_at', models.DateTimeField(blank=True, null=True)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sessions', to='Quiz.quiz')),
+                ('submission', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='exam_session', to='Quiz.submission')),
+            ],
+            options={
+                'db_table': 'EXAM_SESSIONS',
+                'indexes': [models.Index(fields=['status', 'deadline'], name='exam_session_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Quiz', '0007_rescore_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='answer_hash',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='minhash',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['quiz', 'answer_hash'], name='submission_answer_hash_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Quiz', '0008_submission_signatures'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['quiz', 'submitted_at'], name='leaderboard_recent_idx'),
+        ),
+    ]
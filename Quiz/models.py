@@ -1,24 +1,59 @@
 from django.db import models
+from django.db.models import Sum
 import uuid 
 from django.utils import timezone 
 from django.core.exceptions import ValidationError
 
+class QuestionBank(models.Model):
+    """Questions shared by every quiz that links to them (see QuizQuestion)."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    title = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'QUESTION_BANKS'
+
+    def __str__(self):
+        return self.title
+
+
 class Quiz(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     title = models.CharField(max_length=255)
     instructions = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bank that questions authored through this quiz are added to.
+    bank = models.ForeignKey(QuestionBank, on_delete=models.SET_NULL, blank=True, null=True, related_name='quizzes')
+    questions = models.ManyToManyField('Question', through='QuizQuestion', related_name='quizzes')
+    # Seconds allowed per exam session; empty uses settings.EXAM_SESSION_SECONDS.
+    time_limit = models.PositiveIntegerField(blank=True, null=True)
 
     class Meta:
         db_table = 'QUIZZES'
 
     @property
     def total_marks(self):
-        return self.questions.count()
+        # Querysets can annotate ``marks_total`` to skip the aggregate query.
+        if hasattr(self, 'marks_total'):
+            return self.marks_total or 0
+        return self.questions.aggregate(total=Sum('marks'))['total'] or 0
 
     def __str__(self):
         return self.title
 
+    def ensure_bank(self):
+        """Return this quiz's bank, creating one named after the quiz if it has none."""
+        if self.bank_id is None:
+            self.bank = QuestionBank.objects.create(title=self.title)
+            self.save(update_fields=['bank'])
+        return self.bank
+
+    def add_question(self, **fields):
+        """Create a question in this quiz's bank and link it at the end of the quiz."""
+        question = Question.objects.create(bank=self.ensure_bank(), **fields)
+        QuizQuestion.objects.create(quiz=self, question=question, order=question.order)
+        return question
+
 class Question(models.Model):
     SINGLE = "single"
     MULTIPLE = "multiple"
@@ -29,36 +64,87 @@ class Question(models.Model):
         (TEXT, "Text"),
     ]
 
+    EXACT = "exact"
+    PARTIAL = "partial"
+    SCORING_CHOICES = [
+        (EXACT, "All or nothing"),
+        (PARTIAL, "Partial credit"),
+    ]
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='questions')
+    bank = models.ForeignKey(QuestionBank, on_delete=models.CASCADE, related_name='questions')
     text = models.TextField()
     type = models.CharField(max_length=20, choices=TYPE_CHOICES, default=SINGLE)
     order = models.IntegerField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    marks = models.IntegerField(default=1, editable=False)
+    marks = models.FloatField(default=1)
+    # Marks deducted for a wrong answer (the lowest a question can score is -negative_marks).
+    negative_marks = models.FloatField(default=0)
+    scoring = models.CharField(max_length=20, choices=SCORING_CHOICES, default=EXACT)
+    # Text questions: typos within this many edits of an accepted answer still match.
+    fuzzy_distance = models.PositiveSmallIntegerField(default=0)
 
     class Meta:
         db_table = 'QUESTIONS'
 
+
+class QuizQuestion(models.Model):
+    """Ordered link from a quiz to a bank question; cloning a quiz copies only these rows."""
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='question_links')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='quiz_links')
+    order = models.IntegerField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'QUIZ_QUESTIONS'
+        constraints = [
+            models.UniqueConstraint(fields=['quiz', 'question'], name='unique_quiz_question'),
+        ]
+
 class Option(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='options')
     text = models.CharField(max_length=300)
     is_correct = models.BooleanField(default=False)
+    # Fraction of the question's marks awarded for picking this option under partial
+    # credit (negative to penalise). Left empty, correct options share the marks
+    # evenly and incorrect ones cost the same share.
+    weight = models.FloatField(blank=True, null=True)
 
     class Meta:
         db_table = 'OPTIONS'
 
 
+class AcceptedAnswer(models.Model):
+    """An answer that scores a text question; several per question act as synonyms."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='accepted_answers')
+    text = models.CharField(max_length=300)
+    # Regexes must match the whole normalised answer (lower-cased, accents,
+    # surrounding quotes and trailing punctuation stripped, whitespace collapsed).
+    is_regex = models.BooleanField(default=False)
+    # Fraction of the question's marks this answer is worth.
+    weight = models.FloatField(default=1)
+
+    class Meta:
+        db_table = 'ACCEPTED_ANSWERS'
+
+
 class Submission(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='submissions')
-    score = models.PositiveIntegerField(default=0)
-    total = models.PositiveIntegerField(default=0)
+    score = models.FloatField(default=0)
+    total = models.FloatField(default=0)
     submitted_at = models.DateTimeField(auto_now_add=True)
+    # Answer-pattern signatures for duplicate detection (see Quiz.similarity);
+    # computed by detect_duplicates, cleared when the quiz is rescored.
+    answer_hash = models.CharField(max_length=32, blank=True, default='')
+    minhash = models.BinaryField(blank=True, null=True)
 
     class Meta:
         db_table = 'SUBMISSIONS'
+        indexes = [
+            models.Index(fields=['quiz', 'answer_hash'], name='submission_answer_hash_idx'),
+        ]
 
 
 class SubmissionAnswer(models.Model):
@@ -70,3 +156,86 @@ class SubmissionAnswer(models.Model):
 
     class Meta:
         db_table = 'SUBMISSION_ANSWERS'
+
+
+class ExamSession(models.Model):
+    """A timed attempt in progress; autosaved answers are written back in batches (see Quiz.exam_sessions)."""
+    ACTIVE = "active"
+    SUBMITTED = "submitted"
+    EXPIRED = "expired"
+    STATUS_CHOICES = [
+        (ACTIVE, "In progress"),
+        (SUBMITTED, "Submitted"),
+        (EXPIRED, "Expired"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='sessions')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=ACTIVE)
+    started_at = models.DateTimeField(auto_now_add=True)
+    deadline = models.DateTimeField()
+    # Latest answer per question: {question_id: {"selected_options": [...], "text_answer": "..."}}.
+    answers = models.JSONField(default=dict, blank=True)
+    # When the last accepted autosave happened (not when it reached the database).
+    saved_at = models.DateTimeField(blank=True, null=True)
+    submission = models.OneToOneField(
+        Submission, on_delete=models.SET_NULL, blank=True, null=True, related_name='exam_session'
+    )
+
+    class Meta:
+        db_table = 'EXAM_SESSIONS'
+        indexes = [
+            models.Index(fields=['status', 'deadline'], name='exam_session_due_idx'),
+        ]
+
+    @property
+    def remaining_seconds(self):
+        if self.status != self.ACTIVE:
+            return 0
+        return max(0, int((self.deadline - timezone.now()).total_seconds()))
+
+
+class RescoreJob(models.Model):
+    """Regrading of a quiz's submissions after an answer-key fix; resumable (see Quiz.rescoring)."""
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='rescore_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Checkpoint: submissions are regraded in id order, up to and including this one.
+    last_submission_id = models.UUIDField(blank=True, null=True)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    changed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+
+    class Meta:
+        db_table = 'RESCORE_JOBS'
+
+
+class LeaderboardEntry(models.Model):
+    """Persisted copy of a graded submission's ranking key (see Quiz.leaderboard)."""
+    submission = models.OneToOneField(
+        Submission, on_delete=models.CASCADE, primary_key=True, related_name='leaderboard_entry'
+    )
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    score = models.FloatField(default=0)
+    submitted_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'LEADERBOARD_ENTRIES'
+        indexes = [
+            models.Index(fields=['quiz', '-score', 'submitted_at'], name='leaderboard_rank_idx'),
+            models.Index(fields=['quiz', 'submitted_at'], name='leaderboard_recent_idx'),
+        ]
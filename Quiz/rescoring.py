@@ -0,0 +1,220 @@
+"""
+Rescoring a quiz's submissions after its answer key was corrected.
+
+A ``RescoreJob`` walks the quiz's submissions in id order, ``CHUNK_SIZE`` at a
+time. A chunk's answers and selected options are read with one joined query and
+graded against a freshly compiled answer key. Only the submissions whose score
+changed are written back, with one UPDATE per distinct new score: a quiz only
+has a handful of possible scores, so this is far cheaper than a per-row
+``CASE``. Each chunk's writes and the job's checkpoint are committed together,
+so an interrupted job resumes after the last chunk it finished.
+
+A runner claims a job with a conditional UPDATE before starting it. A RUNNING
+job can only be claimed once it has made no progress for STALE_SECONDS (its
+runner died). A checkpoint is only advanced from the value the runner last
+wrote, so a runner that lost its job to another one rolls back its chunk and stops.
+
+Reading and grading a chunk is the expensive part (the database driver converts
+every id it returns), so with more than one worker it runs in a process pool:
+the main process only pages through submission ids, hands each chunk to a
+worker holding the compiled key, and applies the results in order.
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from uuid import UUID
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import CharField, F, Q
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from . import grading, leaderboard
+from .models import LeaderboardEntry, RescoreJob, Submission, SubmissionAnswer
+
+CHUNK_SIZE = getattr(settings, 'RESCORE_CHUNK_SIZE', 1000)
+WORKERS = getattr(settings, 'RESCORE_WORKERS', os.cpu_count() or 1)
+# A RUNNING job whose checkpoint has not moved for this long is taken over.
+STALE_SECONDS = getattr(settings, 'RESCORE_STALE_SECONDS', 600)
+
+UNFINISHED = (RescoreJob.PENDING, RescoreJob.RUNNING, RescoreJob.FAILED)
+
+
+class JobBusy(Exception):
+    """Another runner holds the job."""
+
+
+def create_job(quiz_id):
+    """Queue a rescore of ``quiz_id``, or return its unfinished job so that one resumes instead."""
+    job = RescoreJob.objects.filter(quiz_id=quiz_id, status__in=UNFINISHED).order_by('created_at').first()
+    if job is None:
+        job = RescoreJob.objects.create(quiz_id=quiz_id, total=Submission.objects.filter(quiz_id=quiz_id).count())
+        # Signatures cover the answers that were wrong under the old key.
+        Submission.objects.filter(quiz_id=quiz_id).update(answer_hash='', minhash=None)
+    return job
+
+
+def iter_chunks(quiz_id, after=None, chunk_size=CHUNK_SIZE):
+    """Yield lists of the quiz's submission ids after ``after``, in id order."""
+    while True:
+        submissions = Submission.objects.filter(quiz_id=quiz_id).order_by('id')
+        if after is not None:
+            submissions = submissions.filter(id__gt=after)
+        ids = list(submissions.values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return
+        yield ids
+        after = ids[-1]
+
+
+def load_answers(key, submission_ids):
+    """
+    ``{submission_id: [answer, ...]}`` in submit-payload form, read with one query
+    joining the selected options. Answers to questions no longer in ``key`` are left out.
+    """
+    # Ids are read as text and mapped back through these tables: building a UUID
+    # object for every id of every row would cost more than the grading.
+    submissions = _by_text(submission_ids)
+    questions = _by_text(key.questions)
+    options = _by_text(option_id for question in key.questions.values() for option_id in question.options)
+
+    by_submission = {submission_id: [] for submission_id in submission_ids}
+    current = None
+    rows = SubmissionAnswer.objects.filter(submission_id__in=submission_ids).annotate(
+        submission_text=Cast('submission_id', CharField()),
+        question_text=Cast('question_id', CharField()),
+        option_text=Cast('selected_options', CharField()),
+    ).order_by('submission_id', 'id').values_list('submission_text', 'question_text', 'text_answer', 'option_text')
+    # One row per selected option (or one with no option); a question's rows are adjacent.
+    for submission_id, question_id, text, option_id in rows:
+        if current is None or current[0] != submission_id or current[1] != question_id:
+            question = questions.get(question_id)
+            answer = None
+            if question is not None:
+                answer = {'question': question, 'selected_options': [], 'text_answer': text}
+                by_submission[submissions[submission_id]].append(answer)
+            current = (submission_id, question_id, answer)
+        if option_id is not None and current[2] is not None:
+            current[2]['selected_options'].append(options.get(option_id, option_id))
+    return by_submission
+
+
+def _by_text(ids):
+    """Map each id's textual forms (32-digit hex, as SQLite and MySQL store it, or dashed) to the id."""
+    forms = {}
+    for value in ids:
+        uuid = value if isinstance(value, UUID) else UUID(value)
+        forms[uuid.hex] = forms[str(uuid)] = value
+    return forms
+
+
+def rescore_chunk(key, submission_ids):
+    """Regrade a chunk; returns ``(submission_id, score, total)`` for the ones that changed."""
+    rows = Submission.objects.filter(id__in=submission_ids).values_list('id', 'score', 'total')
+    stored = {submission_id: (score, total) for submission_id, score, total in rows}
+    changed = []
+    for submission_id, answers in load_answers(key, submission_ids).items():
+        graded = key.grade(answers)
+        if stored[submission_id] != (graded.score, graded.total):
+            changed.append((submission_id, graded.score, graded.total))
+    return changed
+
+
+_worker_key = None
+
+
+def _init_worker(key):
+    global _worker_key
+    if not apps.ready:  # "spawn" start method: a fresh interpreter
+        django.setup()
+    _worker_key = key
+
+
+def _rescore_in_worker(submission_ids):
+    return rescore_chunk(_worker_key, submission_ids)
+
+
+def claim(job):
+    """
+    Mark ``job`` RUNNING for this runner and reload its checkpoint. Returns False
+    when another runner holds it: it is RUNNING and made progress recently.
+    """
+    now = timezone.now()
+    claimed = RescoreJob.objects.filter(pk=job.pk).filter(
+        Q(status__in=(RescoreJob.PENDING, RescoreJob.FAILED))
+        | Q(status=RescoreJob.RUNNING, updated_at__lt=now - timedelta(seconds=STALE_SECONDS))
+    ).update(status=RescoreJob.RUNNING, error='', updated_at=now)
+    job.refresh_from_db()
+    return bool(claimed)
+
+
+def _apply(job, submission_ids, changed):
+    """Write a chunk's changed scores and advance the checkpoint in one transaction."""
+    groups = {}
+    for submission_id, score, total in changed:
+        groups.setdefault((score, total), []).append(submission_id)
+    with transaction.atomic():
+        for (score, total), ids in groups.items():
+            Submission.objects.filter(id__in=ids).update(score=score, total=total)
+            LeaderboardEntry.objects.filter(submission_id__in=ids).update(score=score)
+        advanced = RescoreJob.objects.filter(
+            pk=job.pk, status=RescoreJob.RUNNING, last_submission_id=job.last_submission_id
+        ).update(
+            last_submission_id=submission_ids[-1],
+            processed=F('processed') + len(submission_ids),
+            changed=F('changed') + len(changed),
+            updated_at=timezone.now(),
+        )
+        if not advanced:
+            raise JobBusy(f"Rescore job {job.pk} was taken over by another runner.")
+    job.last_submission_id = submission_ids[-1]
+    job.processed += len(submission_ids)
+    job.changed += len(changed)
+
+
+def run(job, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Run (or resume) ``job``; ``workers`` > 1 grades chunks in a process pool.
+    Raises ``JobBusy`` when another runner holds the job.
+    """
+    workers = WORKERS if workers is None else workers
+    if not claim(job):
+        raise JobBusy(f"Rescore job {job.pk} is already running.")
+    try:
+        key, _ = grading.compile_answer_key(job.quiz_id, fresh=True)
+        chunks = iter_chunks(job.quiz_id, job.last_submission_id, chunk_size)
+        if workers > 1:
+            # Forked workers must open their own connections rather than share ours.
+            connections.close_all()
+            with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(key,)) as pool:
+                # A bounded window keeps every worker busy while results are
+                # applied in order, so the checkpoint only ever moves forward.
+                in_flight = deque()
+                for ids in chunks:
+                    in_flight.append((ids, pool.submit(_rescore_in_worker, ids)))
+                    if len(in_flight) >= workers * 2:
+                        done, future = in_flight.popleft()
+                        _apply(job, done, future.result())
+                while in_flight:
+                    done, future = in_flight.popleft()
+                    _apply(job, done, future.result())
+        else:
+            for ids in chunks:
+                _apply(job, ids, rescore_chunk(key, ids))
+    except JobBusy:
+        raise
+    except BaseException as e:
+        job.status = RescoreJob.FAILED
+        job.error = str(e) or type(e).__name__
+        job.save(update_fields=['status', 'error', 'updated_at'])
+        raise
+    finally:
+        leaderboard.invalidate(job.quiz_id)
+
+    job.status = RescoreJob.DONE
+    job.save(update_fields=['status', 'updated_at'])
+    return job
@@ -1,5 +1,18 @@
+import re
+
+from django.db import transaction
 from rest_framework import serializers
-from .models import Quiz, Question, Submission, SubmissionAnswer, Option
+from .models import (
+    Quiz, Question, Submission, SubmissionAnswer, Option, AcceptedAnswer, QuestionBank, QuizQuestion, ExamSession,
+    RescoreJob,
+)
+from .text_matching import MAX_FUZZY_DISTANCE, UnsafePattern, compile_pattern
+
+
+class QuestionBankSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = QuestionBank
+        fields = ['id', 'title', 'created_at']
 
 
 class QuizSerializer(serializers.ModelSerializer):
@@ -7,33 +20,64 @@ class QuizSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Quiz
-        fields = ['id', 'title', 'instructions', 'created_at', 'total_marks']
+        fields = ['id', 'title', 'instructions', 'created_at', 'bank', 'time_limit', 'total_marks']
+        extra_kwargs = {'bank': {'required': False}}
 
 class OptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Option
-        fields = ['id', 'text', 'is_correct']
+        fields = ['id', 'text', 'is_correct', 'weight']
+
+
+class AcceptedAnswerSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AcceptedAnswer
+        fields = ['id', 'text', 'is_regex', 'weight']
 
 
 class QuestionSerializer(serializers.ModelSerializer):
+    # Quiz to link the new question to; it is created in that quiz's bank unless a bank is given.
+    quiz = serializers.PrimaryKeyRelatedField(queryset=Quiz.objects.all(), required=False, write_only=True)
     options = OptionSerializer(many=True, required=False)
+    accepted_answers = AcceptedAnswerSerializer(many=True, required=False)
 
     class Meta:
         model = Question
-        fields = ['id', 'quiz', 'text', 'type', 'order', 'marks', 'options']
+        fields = ['id', 'quiz', 'bank', 'text', 'type', 'order', 'marks', 'negative_marks', 'scoring',
+                  'fuzzy_distance', 'options', 'accepted_answers']
+        extra_kwargs = {'bank': {'required': False}}
 
     def validate(self, attrs):
         q_type = attrs.get('type')
         options = self.initial_data.get('options', [])
 
+        if not attrs.get('quiz') and not attrs.get('bank'):
+            raise serializers.ValidationError("A question needs a quiz or a question bank.")
+
+        if attrs.get('marks', 1) < 0 or attrs.get('negative_marks', 0) < 0:
+            raise serializers.ValidationError("Marks and negative marks cannot be negative.")
+
         # --- Text Question Rules ---
+        accepted = attrs.get('accepted_answers', [])
+
         if q_type == Question.TEXT:
             if options:
                 raise serializers.ValidationError("Text-based questions cannot have options.")
             if len(attrs.get("text", "")) > 300:
                 raise serializers.ValidationError("Text-based question text cannot exceed 300 characters.")
+            if attrs.get('fuzzy_distance', 0) > MAX_FUZZY_DISTANCE:
+                raise serializers.ValidationError(f"fuzzy_distance cannot exceed {MAX_FUZZY_DISTANCE}.")
+            for answer in accepted:
+                if answer.get('is_regex'):
+                    try:
+                        compile_pattern(answer['text'])
+                    except (re.error, UnsafePattern) as e:
+                        raise serializers.ValidationError(f"Invalid accepted answer pattern: {e}")
             return attrs
 
+        if accepted:
+            raise serializers.ValidationError("Only text-based questions can have accepted answers.")
+
         # --- Choice Question Rules ---
         if not options or len(options) < 2:
             raise serializers.ValidationError("Choice questions must have at least two options.")
@@ -50,29 +94,56 @@ class QuestionSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         options_data = validated_data.pop("options", [])
-        question = Question.objects.create(**validated_data)
-
-        if question.type in [Question.SINGLE, Question.MULTIPLE]:
-            for opt in options_data:
-                Option.objects.create(
-                    question=question,
-                    text=opt["text"],
-                    is_correct=opt.get("is_correct", False),
-                )
+        accepted_data = validated_data.pop("accepted_answers", [])
+        quiz = validated_data.pop("quiz", None)
+        if validated_data.get("bank") is None:
+            validated_data["bank"] = quiz.ensure_bank()
+
+        with transaction.atomic():
+            question = Question.objects.create(**validated_data)
+
+            if question.type in [Question.SINGLE, Question.MULTIPLE]:
+                for opt in options_data:
+                    Option.objects.create(
+                        question=question,
+                        text=opt["text"],
+                        is_correct=opt.get("is_correct", False),
+                        weight=opt.get("weight"),
+                    )
+            else:
+                for answer in accepted_data:
+                    AcceptedAnswer.objects.create(question=question, **answer)
+
+            if quiz is not None:
+                QuizQuestion.objects.create(quiz=quiz, question=question, order=question.order)
         return question
 
 class PublicMCQQuestionSerializer(serializers.ModelSerializer):
+    quiz = serializers.SerializerMethodField()
+    order = serializers.SerializerMethodField()
     options = serializers.SerializerMethodField()
 
     class Meta:
         model = Question
         fields = ['id', 'quiz', 'text', 'type', 'order', 'options']
 
+    def get_quiz(self, obj):
+        return self.context.get('quiz_id')
+
+    def get_order(self, obj):
+        # position within the quiz when listed through its links
+        return getattr(obj, 'position', obj.order)
+
     def get_options(self, obj):
         # return only id & text (hide is_correct)
         return [{"id": opt.id, "text": opt.text} for opt in obj.options.all()]
 
 
+class QuestionLinksSerializer(serializers.Serializer):
+    # Omitted: link every question in the quiz's bank.
+    questions = serializers.ListField(child=serializers.UUIDField(), required=False)
+
+
 class SubmissionAnswerSerializer(serializers.ModelSerializer):
     class Meta:
         model = SubmissionAnswer
@@ -86,3 +157,23 @@ class SubmissionSerializer(serializers.ModelSerializer):
         model = Submission
         fields = ['id', 'quiz', 'score', 'total', 'submitted_at'] #'answers']
         read_only_fields = ['score', 'total', 'submitted_at']
+
+
+class ExamSessionSerializer(serializers.ModelSerializer):
+    remaining_seconds = serializers.ReadOnlyField()
+
+    class Meta:
+        model = ExamSession
+        fields = [
+            'id', 'quiz', 'status', 'started_at', 'deadline', 'remaining_seconds', 'saved_at', 'answers', 'submission',
+        ]
+        read_only_fields = fields
+
+
+class RescoreJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RescoreJob
+        fields = [
+            'id', 'quiz', 'status', 'created_at', 'updated_at', 'total', 'processed', 'changed', 'error',
+        ]
+        read_only_fields = fields
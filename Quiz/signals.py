@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import detail_cache
+from .grading import invalidate_bank_key, invalidate_quiz_key
+from .models import AcceptedAnswer, Option, Question, Quiz, QuizQuestion
+
+
+def after_commit(func, *args):
+    """
+    Run ``func(*args)`` once the current transaction commits (at once outside one).
+    A reader that runs before the commit still sees the old rows; if the version
+    were bumped first, it would cache them under the new version.
+    """
+    transaction.on_commit(lambda: func(*args))
+
+
+@receiver([post_save, post_delete], sender=Quiz)
+def quiz_changed(sender, instance, **kwargs):
+    after_commit(detail_cache.invalidate, 'quiz', instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    after_commit(invalidate_bank_key, instance.bank_id)
+    after_commit(detail_cache.invalidate, 'question', instance.pk)
+    # Marks feed the total_marks of every quiz linking the question.
+    for quiz_id in QuizQuestion.objects.filter(question_id=instance.pk).values_list('quiz_id', flat=True):
+        after_commit(detail_cache.invalidate, 'quiz', quiz_id)
+
+
+@receiver([post_save, post_delete], sender=Option)
+@receiver([post_save, post_delete], sender=AcceptedAnswer)
+def option_changed(sender, instance, **kwargs):
+    after_commit(detail_cache.invalidate, 'question', instance.question_id)
+    if sender.question.is_cached(instance):
+        bank_id = instance.question.bank_id
+    else:
+        bank_id = Question.objects.filter(pk=instance.question_id).values_list('bank_id', flat=True).first()
+    if bank_id is not None:
+        after_commit(invalidate_bank_key, bank_id)
+
+
+@receiver([post_save, post_delete], sender=QuizQuestion)
+def link_changed(sender, instance, **kwargs):
+    after_commit(invalidate_quiz_key, instance.quiz_id)
+    after_commit(detail_cache.invalidate, 'quiz', instance.quiz_id)
@@ -0,0 +1,236 @@
+"""
+Answer-pattern signatures for spotting copied submissions.
+
+``manage.py detect_duplicates`` reduces every submission to the answers it got
+wrong: one token per such question (the question plus its selected options, or
+its normalised text answer). Right answers are left out because honest strong
+candidates share them; shared wrong answers are what copying leaves behind, as
+long as they are not ones many honest candidates give too. So a submission is
+only signed for comparison when it has at least MIN_TOKENS wrong answers and
+they are unlikely to coincide: if candidates answered independently, giving each
+wrong answer as often as the quiz's submissions do, fewer than MAX_COINCIDENCES
+of them would be expected to give all of the same ones. A few wrong answers that
+everyone makes are no evidence; a few rare ones are.
+Signatures are computed off the submit path, and two are stored with the
+submission:
+
+* ``answer_hash`` identifies the exact answer set, so identical submissions
+  are a GROUP BY away;
+* ``minhash`` is a 64-slot MinHash of the set: the share of slots two
+  signatures agree on estimates the Jaccard similarity of their answer sets.
+
+Each token's 64 hash values come from one SHAKE-128 digest and are memoised,
+since a quiz's candidates keep giving the same answers; a signature is then an
+element-wise minimum over the tokens.
+
+``find_clusters`` buckets signatures with locality-sensitive hashing (8 bands of
+8 slots), so only submissions that agree on a whole band are ever compared. Two
+submissions become candidates with probability 1 - (1 - s^8)^8 for similarity
+s: about 0.4 at s = 0.7, 0.77 at 0.8 and 0.99 at 0.9, while unrelated answer
+sheets practically never do. Identical answer sets are collapsed first and never
+compared at all.
+"""
+import hashlib
+import struct
+
+from django.conf import settings
+
+from .text_matching import normalize
+
+SLOTS = 64
+BANDS = 8
+ROWS = SLOTS // BANDS
+THRESHOLD = 0.8
+
+# Submissions with fewer wrong answers than this are not compared.
+MIN_TOKENS = getattr(settings, 'DUPLICATE_MIN_TOKENS', 3)
+# Nor are those whose wrong answers this many independent candidates would be expected to share.
+MAX_COINCIDENCES = getattr(settings, 'DUPLICATE_MAX_COINCIDENCES', 0.01)
+# Answer shares are counted out of at least this many submissions, so that the
+# first few submissions to a quiz do not make every answer look common.
+MIN_POPULATION = getattr(settings, 'DUPLICATE_MIN_POPULATION', 100)
+# ``answer_hash`` of a submission whose wrong answers are no evidence: never compared.
+NO_EVIDENCE = '-'
+
+_FORMAT = f'<{SLOTS}I'
+_BAND_BYTES = ROWS * 4
+
+# Per-token hash values remembered; candidates keep producing the same tokens.
+MEMO_SIZE = 8192
+_memo = {}
+
+
+class AnswerShares:
+    """How often each option and each normalised text answer was given across a quiz's submissions."""
+
+    __slots__ = ('submissions', 'options', 'texts')
+
+    def __init__(self, option_counts=(), text_counts=(), submissions=0):
+        """
+        ``option_counts`` holds ``(option_id, times_picked)`` and ``text_counts``
+        ``(question_id, text, times_given)``, over ``submissions`` submissions.
+        """
+        self.submissions = submissions
+        population = max(submissions, MIN_POPULATION)
+        self.options = {str(option_id): count / population for option_id, count in option_counts}
+        totals = {}
+        for question_id, text, count in text_counts:
+            key = (str(question_id), normalize(text))
+            totals[key] = totals.get(key, 0) + count
+        self.texts = {key: count / population for key, count in totals.items()}
+
+    def coincidences(self, token_shares):
+        """Submissions expected to give all of the answers behind ``token_shares`` independently."""
+        expected = self.submissions
+        for share in token_shares:
+            expected *= share
+        return expected
+
+
+# Without counts, any MIN_TOKENS wrong answers are evidence enough.
+NO_SHARES = AnswerShares()
+
+
+def weighted_tokens(answers, shares=NO_SHARES):
+    """
+    ``{token: share}`` for ``(question_id, selected_option_ids, text)`` answers,
+    blank answers giving none. A selection is taken to be as common as its rarest option.
+    """
+    result = {}
+    for question_id, selected, text in answers:
+        if selected:
+            selected = sorted(map(str, selected))
+            share = min(shares.options.get(option_id, 1.0) for option_id in selected)
+            result[f'{question_id}:{",".join(selected)}'] = share
+        elif text:
+            text = normalize(text)
+            if text:
+                result[f'{question_id}={text}'] = shares.texts.get((str(question_id), text), 1.0)
+    return result
+
+
+def tokens(answers):
+    """Tokens for ``(question_id, selected_option_ids, text)`` answers; blank answers give none."""
+    return set(weighted_tokens(answers))
+
+
+def _token_hashes(token):
+    packed = _memo.get(token)
+    if packed is None:
+        if len(_memo) >= MEMO_SIZE:
+            _memo.clear()
+        packed = _memo[token] = hashlib.shake_128(token.encode()).digest(SLOTS * 4)
+    return struct.unpack(_FORMAT, packed)
+
+
+def minhash(token_set):
+    """The packed 64-slot MinHash signature of a non-empty token set."""
+    return struct.pack(_FORMAT, *map(min, zip(*map(_token_hashes, token_set))))
+
+
+def signature(answers, shares=NO_SHARES):
+    """
+    ``(answer_hash, minhash)`` for ``(question_id, selected_option_ids, text)``
+    answers, or ``(NO_EVIDENCE, None)`` when they give fewer than MIN_TOKENS
+    tokens or ones too common (per ``shares``) to set a submission apart.
+    """
+    weighted = weighted_tokens(answers, shares)
+    if len(weighted) < MIN_TOKENS or shares.coincidences(weighted.values()) >= MAX_COINCIDENCES:
+        return NO_EVIDENCE, None
+    token_set = set(weighted)
+    digest = hashlib.blake2b('\n'.join(sorted(token_set)).encode(), digest_size=16).hexdigest()
+    return digest, minhash(token_set)
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of the answer sets behind two packed signatures."""
+    return sum(x == y for x, y in zip(struct.unpack(_FORMAT, a), struct.unpack(_FORMAT, b))) / SLOTS
+
+
+class Cluster:
+    """Submissions whose answers are near-duplicates; ``similarity`` is the weakest link that joined them."""
+
+    __slots__ = ('submissions', 'similarity', 'identical')
+
+    def __init__(self, submissions, similarity, identical):
+        self.submissions = submissions
+        self.similarity = similarity
+        # Size of the largest group of submissions with exactly the same answers.
+        self.identical = identical
+
+    def __len__(self):
+        return len(self.submissions)
+
+
+# Buckets larger than this are linked through one member instead of pairwise.
+MAX_PAIRWISE_BUCKET = 32
+
+
+def find_clusters(rows, threshold=THRESHOLD, min_size=2):
+    """
+    Group ``(submission_id, answer_hash, minhash)`` rows into clusters of at least
+    ``min_size`` submissions whose answer sets are at least ``threshold`` similar,
+    largest first.
+    """
+    groups = {}
+    signatures = {}
+    for submission_id, answer_hash, packed in rows:
+        if not answer_hash or packed is None:
+            continue
+        members = groups.get(answer_hash)
+        if members is None:
+            members = groups[answer_hash] = []
+            signatures[answer_hash] = bytes(packed)
+        members.append(submission_id)
+
+    hashes = list(groups)
+    parent = list(range(len(hashes)))
+    weakest = [1.0] * len(hashes)
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def link(i, j):
+        root_i, root_j = find(i), find(j)
+        if root_i == root_j:
+            return
+        score = similarity(signatures[hashes[i]], signatures[hashes[j]])
+        if score >= threshold:
+            parent[root_j] = root_i
+            weakest[root_i] = min(weakest[root_i], weakest[root_j], score)
+
+    buckets = {}
+    for index, answer_hash in enumerate(hashes):
+        packed = signatures[answer_hash]
+        for band in range(BANDS):
+            start = band * _BAND_BYTES
+            buckets.setdefault((band, packed[start:start + _BAND_BYTES]), []).append(index)
+
+    for bucket in buckets.values():
+        if len(bucket) < 2:
+            continue
+        if len(bucket) <= MAX_PAIRWISE_BUCKET:
+            for n, i in enumerate(bucket):
+                for j in bucket[n + 1:]:
+                    link(i, j)
+        else:
+            first = bucket[0]
+            for previous, j in zip(bucket, bucket[1:]):
+                link(first, j)
+                link(previous, j)
+
+    clustered = {}
+    for index in range(len(hashes)):
+        clustered.setdefault(find(index), []).append(index)
+    clusters = []
+    for root, members in clustered.items():
+        submissions = [submission_id for index in members for submission_id in groups[hashes[index]]]
+        if len(submissions) >= min_size:
+            identical = max(len(groups[hashes[index]]) for index in members)
+            similarity_floor = weakest[root] if len(members) > 1 else 1.0
+            clusters.append(Cluster(submissions, similarity_floor, identical))
+    clusters.sort(key=lambda cluster: (-len(cluster), -cluster.similarity))
+    return clusters
@@ -1,7 +1,21 @@
+import json
+import random
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
 from django.test import TestCase
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
-from .models import Quiz, Question, Option
+from .models import (
+    Quiz, Question, Option, Submission, SubmissionAnswer, LeaderboardEntry, ExamSession,
+    QuizQuestion, RescoreJob,
+)
+from . import exam_sessions, grading, leaderboard, rescoring, similarity, text_matching
 
 
 class QuizAPITests(TestCase):
@@ -41,7 +55,7 @@ class QuestionAPITests(TestCase):
         self.assertEqual(res.data["text"], "What is 2+2?")
 
     def test_list_quiz_questions(self):
-        q = Question.objects.create(quiz=self.quiz, text="2+2?", type="single")
+        q = self.quiz.add_question(text="2+2?", type="single")
         Option.objects.create(question=q, text="4", is_correct=True)
         Option.objects.create(question=q, text="5", is_correct=False)
 
@@ -55,7 +69,7 @@ class SubmissionAPITests(TestCase):
     def setUp(self):
         self.client = APIClient()
         self.quiz = Quiz.objects.create(title="Science Quiz")
-        self.q1 = Question.objects.create(quiz=self.quiz, text="H2O is?", type="single")
+        self.q1 = self.quiz.add_question(text="H2O is?", type="single")
         self.opt1 = Option.objects.create(question=self.q1, text="Water", is_correct=True)
         self.opt2 = Option.objects.create(question=self.q1, text="Oxygen", is_correct=False)
 
@@ -108,7 +122,7 @@ class QuestionAPITests(TestCase):
         self.assertEqual(res.data["text"], "What is 2+2?")
 
     def test_list_quiz_questions(self):
-        q = Question.objects.create(quiz=self.quiz, text="2+2=?", type="single")
+        q = self.quiz.add_question(text="2+2=?", type="single")
         Option.objects.create(question=q, text="4", is_correct=True)
         Option.objects.create(question=q, text="5", is_correct=False)
 
@@ -133,7 +147,7 @@ class SubmissionAPITests(TestCase):
     def setUp(self):
         self.client = APIClient()
         self.quiz = Quiz.objects.create(title="Science Quiz")
-        self.q1 = Question.objects.create(quiz=self.quiz, text="H2O is?", type="single")
+        self.q1 = self.quiz.add_question(text="H2O is?", type="single")
         self.opt1 = Option.objects.create(question=self.q1, text="Water", is_correct=True)
         self.opt2 = Option.objects.create(question=self.q1, text="Oxygen", is_correct=False)
 
@@ -169,7 +183,7 @@ class SubmissionAPITests(TestCase):
 
     # ❌ Negative: text answer too long
     def test_submit_text_answer_too_long(self):
-        q2 = Question.objects.create(quiz=self.quiz, text="Explain gravity", type="text")
+        q2 = self.quiz.add_question(text="Explain gravity", type="text")
         long_text = "a" * 400  # 400 chars
         payload = {
             "answers": [
@@ -179,3 +193,670 @@ class SubmissionAPITests(TestCase):
         res = self.client.post(f"/api/quizzes/{self.quiz.id}/submit/", payload, format="json")
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertLessEqual(len(res.data["answers"][0]["text_answer"]), 300)
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        leaderboard.invalidate()
+        self.client = APIClient()
+        self.quiz = Quiz.objects.create(title="Ranked Quiz")
+        self.q1 = self.quiz.add_question(text="1+1?", type="single")
+        self.right = Option.objects.create(question=self.q1, text="2", is_correct=True)
+        self.wrong = Option.objects.create(question=self.q1, text="3", is_correct=False)
+
+    def submit(self, option):
+        payload = {"answers": [{"question": str(self.q1.id), "selected_options": [str(option.id)]}]}
+        return self.client.post(f"/api/quizzes/{self.quiz.id}/submit/", payload, format="json").data
+
+    def test_leaderboard_orders_by_score_then_time(self):
+        first_wrong = self.submit(self.wrong)
+        first_right = self.submit(self.right)
+        second_right = self.submit(self.right)
+
+        res = self.client.get(f"/api/quizzes/{self.quiz.id}/leaderboard/")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [str(row["submission"]) for row in res.data],
+            [first_right["id"], second_right["id"], first_wrong["id"]],
+        )
+        self.assertEqual([row["rank"] for row in res.data], [1, 2, 3])
+
+    def test_submission_rank(self):
+        self.submit(self.right)
+        mine = self.submit(self.wrong)
+
+        res = self.client.get(f"/api/submissions/{mine['id']}/rank/")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["rank"], 2)
+        self.assertEqual(res.data["out_of"], 2)
+
+    def test_board_reloads_from_table(self):
+        self.submit(self.right)
+        leaderboard.invalidate(self.quiz.id)
+        self.assertEqual(len(leaderboard.get_board(self.quiz.id)), 1)
+        self.assertEqual(LeaderboardEntry.objects.filter(quiz=self.quiz).count(), 1)
+
+    def test_entry_is_written_with_submission(self):
+        graded = grading.get_answer_key(self.quiz.id).grade(
+            [{"question": str(self.q1.id), "selected_options": [str(self.right.id)]}]
+        )
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            grading.save_submission(self.quiz.id, graded)
+            raise RuntimeError
+        self.assertFalse(LeaderboardEntry.objects.filter(quiz=self.quiz).exists())
+
+        submission = grading.save_submission(self.quiz.id, graded)
+        self.assertEqual(LeaderboardEntry.objects.get(quiz=self.quiz).submission_id, submission.id)
+
+    def graded_elsewhere(self, score):
+        """A submission recorded by another worker: in the table, not on this worker's board."""
+        submission = Submission.objects.create(quiz=self.quiz, score=score, total=1)
+        LeaderboardEntry.objects.create(
+            submission=submission, quiz=self.quiz, score=score, submitted_at=submission.submitted_at
+        )
+        return submission
+
+    def test_rank_loads_entry_missing_from_board(self):
+        self.submit(self.wrong)
+        board = leaderboard.get_board(self.quiz.id)
+        other = self.graded_elsewhere(1)
+
+        res = self.client.get(f"/api/submissions/{other.id}/rank/")
+        self.assertEqual(res.data["rank"], 1)
+        self.assertEqual(res.data["out_of"], 2)
+        self.assertIs(leaderboard.get_board(self.quiz.id), board)
+
+    def test_refresh_reads_only_new_entries(self):
+        self.submit(self.right)
+        board = leaderboard.get_board(self.quiz.id)
+        self.graded_elsewhere(0)
+        board.loaded_at -= leaderboard.REFRESH_SECONDS + 1
+
+        with self.assertNumQueries(1):
+            refreshed = leaderboard.get_board(self.quiz.id)
+        self.assertIs(refreshed, board)
+        self.assertEqual(len(board), 2)
+
+
+class GradingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.quiz = Quiz.objects.create(title="Weighted Quiz")
+        self.single = self.quiz.add_question(text="Capital of France?", type="single",
+                                             marks=2, negative_marks=0.5)
+        self.paris = Option.objects.create(question=self.single, text="Paris", is_correct=True)
+        self.rome = Option.objects.create(question=self.single, text="Rome", is_correct=False)
+        self.multi = self.quiz.add_question(text="Primes?", type="multiple",
+                                            marks=4, scoring=Question.PARTIAL)
+        self.two = Option.objects.create(question=self.multi, text="2", is_correct=True)
+        self.three = Option.objects.create(question=self.multi, text="3", is_correct=True)
+        self.four = Option.objects.create(question=self.multi, text="4", is_correct=False)
+
+    def submit(self, answers):
+        return self.client.post(f"/api/quizzes/{self.quiz.id}/submit/", {"answers": answers}, format="json")
+
+    def test_total_marks_uses_question_weights(self):
+        self.assertEqual(self.quiz.total_marks, 6)
+        res = self.submit([])
+        self.assertEqual(res.data["total"], 6)
+
+    def test_partial_credit_and_negative_marking(self):
+        res = self.submit([
+            {"question": str(self.single.id), "selected_options": [str(self.rome.id)]},
+            {"question": str(self.multi.id), "selected_options": [str(self.two.id)]},
+        ])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["score"], -0.5 + 2)
+
+    def test_partial_credit_wrong_pick_cancels_right_pick(self):
+        res = self.submit([
+            {"question": str(self.multi.id), "selected_options": [str(self.two.id), str(self.four.id)]},
+        ])
+        self.assertEqual(res.data["score"], 0)
+
+    def test_explicit_option_weights(self):
+        Option.objects.filter(pk=self.four.pk).update(weight=0.25)
+        grading.invalidate_bank_key(self.quiz.bank_id)
+        res = self.submit([{"question": str(self.multi.id), "selected_options": [str(self.four.id)]}])
+        self.assertEqual(res.data["score"], 1)
+
+    def test_answer_key_refreshes_after_edit(self):
+        self.submit([])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.paris.is_correct = False
+            self.paris.save()
+            self.rome.is_correct = True
+            self.rome.save()
+        res = self.submit([{"question": str(self.single.id), "selected_options": [str(self.rome.id)]}])
+        self.assertEqual(res.data["score"], 2)
+
+    def test_answer_key_is_invalidated_on_commit(self):
+        self.submit([])
+        version_key = grading._bank_version_key(self.quiz.bank_id)
+        before = cache.get(version_key, 0)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.quiz.add_question(text="Largest prime below 10?", type="text")
+            # a submit racing this transaction still caches the old rows under the old version
+            self.assertEqual(cache.get(version_key, 0), before)
+        self.assertTrue(callbacks)
+        self.assertNotEqual(cache.get(version_key, 0), before)
+
+    def test_answer_key_expires_without_invalidation(self):
+        self.submit([])
+        # An edit made by a worker that does not share this one's cache.
+        Option.objects.filter(pk=self.rome.pk).update(is_correct=True)
+        Option.objects.filter(pk=self.paris.pk).update(is_correct=False)
+        answers = [{"question": str(self.single.id), "selected_options": [str(self.rome.id)]}]
+        self.assertEqual(self.submit(answers).data["score"], -0.5)
+        with mock.patch.object(grading, "MAX_AGE_SECONDS", 0):
+            self.assertEqual(self.submit(answers).data["score"], 2)
+
+    def test_submit_query_count_is_independent_of_answer_count(self):
+        self.submit([])  # warm the answer key
+        answers = [
+            {"question": str(self.single.id), "selected_options": [str(self.paris.id)]},
+            {"question": str(self.multi.id), "selected_options": [str(self.two.id), str(self.three.id)]},
+        ]
+        with self.assertNumQueries(7):
+            res = self.submit(answers)
+        self.assertEqual(res.data["score"], 6)
+        submission = Submission.objects.get(pk=res.data["id"])
+        self.assertEqual(submission.answers.count(), 2)
+        self.assertEqual(SubmissionAnswer.selected_options.through.objects.filter(
+            submissionanswer__submission=submission).count(), 3)
+
+
+class TextAnswerGradingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.quiz = Quiz.objects.create(title="Capitals")
+        res = self.client.post(f"/api/quizzes/{self.quiz.id}/questions/", {
+            "text": "Capital of Germany?",
+            "type": "text",
+            "marks": 2,
+            "fuzzy_distance": 1,
+            "accepted_answers": [
+                {"text": "Berlin"},
+                {"text": "berlin,? germany", "is_regex": True, "weight": 0.5},
+            ],
+        }, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.question_id = res.data["id"]
+
+    def submit(self, text):
+        payload = {"answers": [{"question": self.question_id, "text_answer": text}]}
+        return self.client.post(f"/api/quizzes/{self.quiz.id}/submit/", payload, format="json").data["score"]
+
+    def test_normalized_exact_match(self):
+        self.assertEqual(self.submit("  BERLIN. "), 2)
+
+    def test_regex_answer_weight(self):
+        self.assertEqual(self.submit("Berlin Germany"), 1)
+
+    def test_fuzzy_match_within_distance(self):
+        self.assertEqual(self.submit("Berlni"), 0)
+        self.assertEqual(self.submit("Berln"), 2)
+
+    def test_wrong_answer_scores_zero(self):
+        self.assertEqual(self.submit("Munich"), 0)
+
+    def test_invalid_pattern_rejected(self):
+        res = self.client.post(f"/api/quizzes/{self.quiz.id}/questions/", {
+            "text": "Broken", "type": "text", "accepted_answers": [{"text": "(", "is_regex": True}],
+        }, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unbounded_patterns_rejected(self):
+        for pattern in ["(a+)+b", "(?:a|ab)*c", r"(\w)\1", r"\w+ ?\w+ ?\w+"]:
+            res = self.client.post(f"/api/quizzes/{self.quiz.id}/questions/", {
+                "text": "Risky", "type": "text", "accepted_answers": [{"text": pattern, "is_regex": True}],
+            }, format="json")
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, pattern)
+        text_matching.compile_pattern(r"(the )?river \w+( delta)?")
+
+    def test_pattern_is_folded_like_answers(self):
+        matcher = text_matching.TextMatcher([("caf[ée]( au lait)?", True, 1)])
+        self.assertEqual(matcher.match("Café au lait"), 1)
+        self.assertEqual(matcher.match("CAFE"), 1)
+
+    def test_normalize(self):
+        self.assertEqual(text_matching.normalize("  Café\tAU  lait!! "), "cafe au lait")
+        self.assertEqual(text_matching.normalize(' "Paris". '), "paris")
+        self.assertEqual(text_matching.normalize("-5"), "-5")
+        self.assertEqual(text_matching.normalize("C++"), "c++")
+        self.assertEqual(text_matching.normalize(".NET"), ".net")
+        self.assertTrue(text_matching.within_distance("kitten", "sitting", 3))
+        self.assertFalse(text_matching.within_distance("kitten", "sitting", 2))
+
+
+class QuestionBankTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.quiz = Quiz.objects.create(title="Cohort A", time_limit=120)
+        self.q1 = self.quiz.add_question(text="2+2?", type="single", order=2)
+        self.four = Option.objects.create(question=self.q1, text="4", is_correct=True)
+        Option.objects.create(question=self.q1, text="5", is_correct=False)
+        self.q2 = self.quiz.add_question(text="3+3?", type="single", order=1)
+        self.six = Option.objects.create(question=self.q2, text="6", is_correct=True)
+        Option.objects.create(question=self.q2, text="7", is_correct=False)
+
+    def test_questions_created_through_quiz_land_in_its_bank(self):
+        res = self.client.post(f"/api/quizzes/{self.quiz.id}/questions/", {
+            "text": "1+1?", "type": "single",
+            "options": [{"text": "2", "is_correct": True}, {"text": "3", "is_correct": False}],
+        }, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(str(res.data["bank"]), str(self.quiz.bank_id))
+        self.assertEqual(self.quiz.questions.count(), 3)
+
+    def test_listing_follows_link_order(self):
+        res = self.client.get(f"/api/quizzes/{self.quiz.id}/all-questions/")
+        self.assertEqual([q["text"] for q in res.data], ["3+3?", "2+2?"])
+        self.assertEqual(res.data[0]["quiz"], self.quiz.id)
+
+    def test_clone_copies_links_only(self):
+        questions_before = Question.objects.count()
+        res = self.client.post(f"/api/quizzes/{self.quiz.id}/clone/", {"title": "Cohort B"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Question.objects.count(), questions_before)
+        self.assertEqual(res.data["total_marks"], 2)
+        self.assertEqual(res.data["time_limit"], 120)
+        override = self.client.post(f"/api/quizzes/{self.quiz.id}/clone/", {"time_limit": 90}, format="json")
+        self.assertEqual(override.data["time_limit"], 90)
+        bad = self.client.post(f"/api/quizzes/{self.quiz.id}/clone/", {"time_limit": "soon"}, format="json")
+        self.assertEqual(bad.status_code, status.HTTP_400_BAD_REQUEST)
+
+        clone_id = res.data["id"]
+        payload = {"answers": [
+            {"question": str(self.q1.id), "selected_options": [str(self.four.id)]},
+            {"question": str(self.q2.id), "selected_options": [str(self.six.id)]},
+        ]}
+        res = self.client.post(f"/api/quizzes/{clone_id}/submit/", payload, format="json")
+        self.assertEqual(res.data["score"], 2)
+
+        # both quizzes grade with the same compiled question tables
+        self.assertIs(
+            grading.get_answer_key(self.quiz.id).questions[str(self.q1.id)],
+            grading.get_answer_key(Quiz.objects.get(pk=clone_id).id).questions[str(self.q1.id)],
+        )
+
+    def test_failed_clone_leaves_nothing_behind(self):
+        quizzes_before = Quiz.objects.count()
+        with mock.patch.object(QuizQuestion.objects, "bulk_create", side_effect=RuntimeError("boom")):
+            res = self.client.post(f"/api/quizzes/{self.quiz.id}/clone/", {"title": "Cohort C"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(Quiz.objects.count(), quizzes_before)
+
+    def test_link_rejects_malformed_ids(self):
+        for questions in (["not-a-uuid"], str(self.q1.id)):
+            res = self.client.post(f"/api/quizzes/{self.quiz.id}/links/", {"questions": questions}, format="json")
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_link_questions_from_bank(self):
+        bank = self.client.post("/api/banks/", {"title": "Arithmetic"}, format="json").data
+        res = self.client.post(f"/api/banks/{bank['id']}/questions/", {
+            "text": "10/2?", "type": "single",
+            "options": [{"text": "5", "is_correct": True}, {"text": "2", "is_correct": False}],
+        }, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        question_id = res.data["id"]
+
+        res = self.client.post(f"/api/quizzes/{self.quiz.id}/links/", {"questions": [question_id]}, format="json")
+        self.assertEqual(res.data["linked"], 1)
+        self.assertEqual(self.quiz.total_marks, 3)
+
+        option_id = Option.objects.get(question_id=question_id, is_correct=True).id
+        payload = {"answers": [{"question": question_id, "selected_options": [str(option_id)]}]}
+        res = self.client.post(f"/api/quizzes/{self.quiz.id}/submit/", payload, format="json")
+        self.assertEqual(res.data["score"], 1)
+        self.assertEqual(res.data["total"], 3)
+
+    def test_unlinked_bank_question_is_rejected(self):
+        other = Quiz.objects.create(title="Other")
+        stranger = other.add_question(text="?", type="text")
+        payload = {"answers": [{"question": str(stranger.id), "text_answer": "x"}]}
+        res = self.client.post(f"/api/quizzes/{self.quiz.id}/submit/", payload, format="json")
+        self.assertEqual(Submission.objects.filter(quiz=self.quiz).count(), 0)
+        self.assertNotEqual(res.status_code, status.HTTP_200_OK)
+
+
+class ExamSessionTests(TestCase):
+    def setUp(self):
+        exam_sessions._store.clear()
+        exam_sessions.flush()
+        leaderboard.invalidate()
+        # The flusher thread would write from its own connection, outside the test's transaction.
+        patcher = mock.patch.object(exam_sessions, "FLUSH_IN_BACKGROUND", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.quiz = Quiz.objects.create(title="Timed Quiz", time_limit=600)
+        self.q1 = self.quiz.add_question(text="1+1?", type="single")
+        self.right = Option.objects.create(question=self.q1, text="2", is_correct=True)
+        self.wrong = Option.objects.create(question=self.q1, text="3", is_correct=False)
+        self.q2 = self.quiz.add_question(text="Capital of France?", type="text")
+        self.q2.accepted_answers.create(text="Paris")
+
+    def start(self):
+        res = self.client.post(f"/api/quizzes/{self.quiz.id}/sessions/")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.data["id"]
+
+    def autosave(self, session_id, *answers):
+        return self.client.put(f"/api/sessions/{session_id}/answers/", {"answers": list(answers)}, format="json")
+
+    def test_holding_a_session_starts_background_flusher(self):
+        with mock.patch.object(exam_sessions, "FLUSH_IN_BACKGROUND", True), \
+                mock.patch.object(exam_sessions, "_flusher", None), \
+                mock.patch.object(exam_sessions.threading, "Thread") as thread:
+            self.start()
+            self.start()
+        thread.assert_called_once_with(
+            target=exam_sessions._flush_periodically, name="exam-session-flusher", daemon=True
+        )
+        thread.return_value.start.assert_called_once_with()
+
+    def test_autosaves_are_batched_until_flush(self):
+        session_id = self.start()
+        self.assertGreater(self.client.get(f"/api/sessions/{session_id}/").data["remaining_seconds"], 590)
+
+        res = self.autosave(session_id, {"question": str(self.q1.id), "selected_options": [str(self.wrong.id)]})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            self.autosave(session_id, {"question": str(self.q1.id), "selected_options": [str(self.right.id)]})
+            self.autosave(session_id, {"question": str(self.q2.id), "text_answer": "paris"})
+        self.assertEqual(ExamSession.objects.get(pk=session_id).answers, {})
+        self.assertEqual(len(self.client.get(f"/api/sessions/{session_id}/").data["answers"]), 2)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(exam_sessions.flush(), 1)
+        saved = ExamSession.objects.get(pk=session_id).answers
+        self.assertEqual(saved[str(self.q1.id)]["selected_options"], [str(self.right.id)])
+        self.assertEqual(saved[str(self.q2.id)]["text_answer"], "paris")
+
+    def test_submit_grades_saved_and_final_answers_once(self):
+        session_id = self.start()
+        self.autosave(session_id, {"question": str(self.q1.id), "selected_options": [str(self.right.id)]})
+        res = self.client.post(f"/api/sessions/{session_id}/submit/", {
+            "answers": [{"question": str(self.q2.id), "text_answer": "Paris"}],
+        }, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["score"], 2)
+        self.assertEqual(res.data["session_status"], ExamSession.SUBMITTED)
+        self.assertEqual(self.client.get(f"/api/submissions/{res.data['id']}/rank/").data["rank"], 1)
+
+        again = self.client.post(f"/api/sessions/{session_id}/submit/", {}, format="json")
+        self.assertEqual(again.status_code, status.HTTP_409_CONFLICT)
+        late = self.autosave(session_id, {"question": str(self.q2.id), "text_answer": "Lyon"})
+        self.assertEqual(late.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Submission.objects.filter(quiz=self.quiz).count(), 1)
+
+    def test_deadline_is_enforced_on_the_server(self):
+        session_id = self.start()
+        self.autosave(session_id, {"question": str(self.q1.id), "selected_options": [str(self.right.id)]})
+        exam_sessions.flush()
+        session = exam_sessions._store.get(exam_sessions.get_session(session_id).id)
+        session.deadline = timezone.now() - timedelta(seconds=1)
+
+        res = self.autosave(session_id, {"question": str(self.q2.id), "text_answer": "Paris"})
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        res = self.client.post(f"/api/sessions/{session_id}/submit/", {
+            "answers": [{"question": str(self.q2.id), "text_answer": "Paris"}],
+        }, format="json")
+        self.assertEqual(res.data["score"], 1)
+        self.assertEqual(res.data["session_status"], ExamSession.EXPIRED)
+
+    def test_sweeper_finalizes_expired_sessions_in_bulk(self):
+        past = timezone.now() - timedelta(minutes=5)
+        answers = {str(self.q1.id): {"selected_options": [str(self.right.id)], "text_answer": ""}}
+        expired = ExamSession.objects.bulk_create([
+            ExamSession(quiz=self.quiz, deadline=past, answers=answers) for _ in range(3)
+        ])
+        ongoing = self.start()
+
+        out = StringIO()
+        call_command('finalize_expired_sessions', grace=0, batch_size=2, stdout=out)
+        self.assertIn("Finalized 3", out.getvalue())
+        for session in ExamSession.objects.filter(pk__in=[s.id for s in expired]):
+            self.assertEqual(session.status, ExamSession.EXPIRED)
+            self.assertEqual(session.submission.score, 1)
+        self.assertEqual(ExamSession.objects.get(pk=ongoing).status, ExamSession.ACTIVE)
+        self.assertEqual(LeaderboardEntry.objects.filter(quiz=self.quiz).count(), 3)
+
+
+class DetailCacheTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.quiz = Quiz.objects.create(title="Dashboard Quiz")
+        self.q1 = self.quiz.add_question(text="1+1?", type="single", marks=2)
+        self.right = Option.objects.create(question=self.q1, text="2", is_correct=True)
+        Option.objects.create(question=self.q1, text="3", is_correct=False)
+
+    def test_quiz_detail_is_cached_until_a_write(self):
+        with self.assertNumQueries(1):
+            res = self.client.get(f"/api/quizzes/{self.quiz.id}/")
+        self.assertEqual(res.data["total_marks"], 2)
+        with self.assertNumQueries(0):
+            again = self.client.get(f"/api/quizzes/{self.quiz.id}/")
+        self.assertEqual(again["ETag"], res["ETag"])
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.quiz.add_question(text="2+2?", type="text", marks=3)
+            # until the write commits, the version (and so the ETag) stays put
+            with self.assertNumQueries(0):
+                during = self.client.get(f"/api/quizzes/{self.quiz.id}/")
+            self.assertEqual(during["ETag"], again["ETag"])
+        self.assertTrue(callbacks)
+        res = self.client.get(f"/api/quizzes/{self.quiz.id}/")
+        self.assertEqual(res.data["total_marks"], 5)
+        self.assertNotEqual(res["ETag"], again["ETag"])
+
+    def test_conditional_get(self):
+        res = self.client.get(f"/api/questions/{self.q1.id}/")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["options"]), 2)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(f"/api/questions/{self.q1.id}/", HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        since = self.client.get(f"/api/questions/{self.q1.id}/", HTTP_IF_MODIFIED_SINCE=res["Last-Modified"])
+        self.assertEqual(since.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.right.text = "two"
+            self.right.save()
+        with self.assertNumQueries(3):
+            res = self.client.get(f"/api/questions/{self.q1.id}/", HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("two", [option["text"] for option in res.data["options"]])
+
+
+class RescoreTests(TestCase):
+    def setUp(self):
+        leaderboard.invalidate()
+        self.client = APIClient()
+        self.quiz = Quiz.objects.create(title="Misprinted Quiz")
+        self.q1 = self.quiz.add_question(text="1+1?", type="single")
+        # the author marked the wrong option as correct
+        self.right = Option.objects.create(question=self.q1, text="2", is_correct=False)
+        self.wrong = Option.objects.create(question=self.q1, text="3", is_correct=True)
+        self.q2 = self.quiz.add_question(text="Capital of France?", type="text")
+        self.q2.accepted_answers.create(text="Paris")
+        for option in (self.right, self.right, self.wrong):
+            self.client.post(f"/api/quizzes/{self.quiz.id}/submit/", {"answers": [
+                {"question": str(self.q1.id), "selected_options": [str(option.id)]},
+                {"question": str(self.q2.id), "text_answer": "paris"},
+            ]}, format="json")
+        self.right.is_correct, self.wrong.is_correct = True, False
+        self.right.save()
+        self.wrong.save()
+
+    def scores(self):
+        return sorted(Submission.objects.filter(quiz=self.quiz).values_list('score', flat=True))
+
+    def test_rescore_updates_scores_and_leaderboard(self):
+        self.assertEqual(self.scores(), [1, 1, 2])
+        out = StringIO()
+        call_command('rescore_quiz', str(self.quiz.id), workers=1, chunk_size=2, stdout=out)
+        self.assertIn("Rescored 3 submission(s), 3 changed.", out.getvalue())
+        self.assertEqual(self.scores(), [1, 2, 2])
+        self.assertEqual(
+            sorted(LeaderboardEntry.objects.filter(quiz=self.quiz).values_list('score', flat=True)), [1, 2, 2]
+        )
+        self.assertEqual(leaderboard.top(self.quiz.id, 1)[0][2], 2)
+
+    def test_unlinked_questions_stop_counting(self):
+        self.quiz.question_links.filter(question=self.q2).delete()
+        job = rescoring.run(rescoring.create_job(self.quiz.id), workers=1, chunk_size=1)
+        self.assertEqual((job.status, job.processed, job.changed), (RescoreJob.DONE, 3, 3))
+        self.assertEqual(self.scores(), [0, 1, 1])
+        self.assertEqual(set(Submission.objects.filter(quiz=self.quiz).values_list('total', flat=True)), {1})
+
+    def test_resumes_after_checkpoint(self):
+        first = Submission.objects.filter(quiz=self.quiz).order_by('id').first()
+        job = rescoring.create_job(self.quiz.id)
+        job.status, job.last_submission_id, job.processed = RescoreJob.FAILED, first.id, 1
+        job.save()
+
+        self.assertEqual(rescoring.create_job(self.quiz.id), job)
+        job = rescoring.run(job, workers=1)
+        self.assertEqual((job.status, job.processed), (RescoreJob.DONE, 3))
+        # the checkpointed submission is not regraded again
+        first.refresh_from_db()
+        self.assertEqual(first.score, 1 if first.answers.filter(selected_options=self.right).exists() else 2)
+
+    def test_running_job_is_not_claimed_twice(self):
+        job = rescoring.create_job(self.quiz.id)
+        RescoreJob.objects.filter(pk=job.pk).update(status=RescoreJob.RUNNING, updated_at=timezone.now())
+        with self.assertRaises(rescoring.JobBusy):
+            rescoring.run(job, workers=1)
+        out = StringIO()
+        call_command('rescore_quiz', pending=True, workers=1, stdout=out)
+        self.assertIn("Skipped", out.getvalue())
+        self.assertEqual(self.scores(), [1, 1, 2])
+
+        # its runner died: no progress for longer than STALE_SECONDS
+        stale = timezone.now() - timedelta(seconds=rescoring.STALE_SECONDS + 1)
+        RescoreJob.objects.filter(pk=job.pk).update(updated_at=stale)
+        job = rescoring.run(job, workers=1)
+        self.assertEqual((job.status, job.processed, job.total), (RescoreJob.DONE, 3, 3))
+
+    def test_checkpoint_only_advances_for_its_runner(self):
+        job = rescoring.create_job(self.quiz.id)
+        self.assertTrue(rescoring.claim(job))
+        ids = [next(rescoring.iter_chunks(self.quiz.id))[0]]
+        # another runner took the job over and moved on
+        RescoreJob.objects.filter(pk=job.pk).update(last_submission_id=ids[0])
+        with self.assertRaises(rescoring.JobBusy):
+            rescoring._apply(job, ids, [(ids[0], 5, 2)])
+        self.assertNotIn(5, self.scores())
+
+    def test_rescore_api_queues_one_job(self):
+        res = self.client.post(f"/api/quizzes/{self.quiz.id}/rescore/")
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        again = self.client.post(f"/api/quizzes/{self.quiz.id}/rescore/")
+        self.assertEqual(again.data["id"], res.data["id"])
+
+        call_command('rescore_quiz', pending=True, workers=1, stdout=StringIO())
+        res = self.client.get(f"/api/rescore-jobs/{res.data['id']}/")
+        self.assertEqual(res.data["status"], RescoreJob.DONE)
+        self.assertEqual(res.data["changed"], 3)
+
+
+class DuplicateDetectionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.quiz = Quiz.objects.create(title="Proctored Quiz")
+        self.questions = []
+        for n in range(4):
+            question = self.quiz.add_question(text=f"Question {n}", type="single")
+            options = {
+                name: Option.objects.create(question=question, text=name, is_correct=name == "right")
+                for name in ("right", "common", "rare")
+            }
+            self.questions.append((question, options))
+        self.text = self.quiz.add_question(text="Capital of France?", type="text")
+        self.text.accepted_answers.create(text="Paris")
+
+    def add(self, picks, text="Paris", count=1):
+        """Save ``count`` submissions picking ``picks[n]`` (default "right") for question n."""
+        key, _ = grading.compile_answer_key(self.quiz.id, fresh=True)
+        payload = [
+            {"question": str(question.id), "selected_options": [str(options[picks.get(n, "right")].id)]}
+            for n, (question, options) in enumerate(self.questions)
+        ]
+        payload.append({"question": str(self.text.id), "text_answer": text})
+        return grading.save_submissions([(self.quiz.id, key.grade(payload))] * count)
+
+    def detect(self, **options):
+        out = StringIO()
+        call_command('detect_duplicates', str(self.quiz.id), json=True, stdout=out, stderr=StringIO(), **options)
+        return json.loads(out.getvalue())
+
+    def test_common_mistakes_are_not_reported(self):
+        # most candidates fall for the same three distractors without having copied
+        honest = self.add({0: "common", 1: "common", 2: "common"}, count=40)
+        first, = self.add({0: "rare", 1: "rare", 2: "rare"}, text="Lyon")
+        same, = self.add({0: "rare", 1: "rare", 2: "rare"}, text="  lyon.")
+        few, = self.add({3: "rare"}, text="Marseille")
+        self.assertEqual((first.answer_hash, first.minhash), ("", None))
+
+        report = self.detect()
+        self.assertEqual(len(report), 1)
+        self.assertEqual(sorted(report[0]["submissions"]), sorted([str(first.id), str(same.id)]))
+        for submission in (first, same, few, honest[0]):
+            submission.refresh_from_db()
+        self.assertEqual(first.answer_hash, same.answer_hash)
+        self.assertEqual(similarity.similarity(first.minhash, same.minhash), 1)
+        # two wrong answers are below MIN_TOKENS; three that most candidates give are no evidence
+        self.assertEqual((few.answer_hash, few.minhash), (similarity.NO_EVIDENCE, None))
+        self.assertEqual((honest[0].answer_hash, honest[0].minhash), (similarity.NO_EVIDENCE, None))
+
+        rescoring.create_job(self.quiz.id)
+        self.assertFalse(Submission.objects.filter(quiz=self.quiz).exclude(answer_hash="").exists())
+
+    def test_nothing_is_signed_on_submit(self):
+        question, options = self.questions[0]
+        payload = {"answers": [{"question": str(question.id), "selected_options": [str(options["rare"].id)]}]}
+        res = self.client.post(f"/api/quizzes/{self.quiz.id}/submit/", payload, format="json")
+        submission = Submission.objects.get(pk=res.data["id"])
+        self.assertEqual((submission.answer_hash, submission.minhash), ("", None))
+
+    def test_near_duplicates_are_clustered(self):
+        rng = random.Random(7)
+        questions = [(f"q{n}", [f"q{n}-o{i}" for i in range(4)]) for n in range(20)]
+
+        def row(name, answers):
+            return (name, *similarity.signature((question, [option], "") for question, option in answers.items()))
+
+        source = {question: rng.choice(options) for question, options in questions}
+        copy = dict(source, q3="q3-o9")
+        rows = [row("source", source), row("copy", copy), row("twin", source)]
+        rows += [row(f"other{n}", {q: rng.choice(o) for q, o in questions}) for n in range(50)]
+
+        clusters = similarity.find_clusters(rows)
+        self.assertEqual(len(clusters), 1)
+        self.assertEqual(sorted(clusters[0].submissions), ["copy", "source", "twin"])
+        self.assertEqual(clusters[0].identical, 2)
+        self.assertGreaterEqual(clusters[0].similarity, similarity.THRESHOLD)
+
+    def test_detect_duplicates_command(self):
+        a, = self.add({0: "rare", 1: "rare", 3: "rare"}, text="Lyon")
+        b, = self.add({0: "rare", 1: "rare", 3: "rare"}, text="lyon")
+        self.add({0: "rare", 1: "rare"}, text="Lyon")
+        # candidates with every answer right look alike without having copied
+        self.add({}, count=2)
+
+        report = self.detect()
+        self.assertEqual(len(report), 1)
+        self.assertEqual(sorted(report[0]["submissions"]), sorted([str(a.id), str(b.id)]))
+        self.assertEqual(report[0]["identical"], 2)
+
+    def test_resign_after_mistakes_become_common(self):
+        self.add({0: "rare", 1: "rare", 2: "rare"}, count=2)
+        self.assertEqual(len(self.detect()), 1)
+
+        # the pair's distractors turn out to be popular once more candidates sit the quiz
+        self.add({0: "rare", 1: "rare", 2: "rare"}, count=40)
+        self.assertEqual(len(self.detect()), 1)  # the pair keeps its old signatures
+        self.assertEqual(self.detect(resign=True), [])
@@ -0,0 +1,212 @@
+"""
+Matching free-text answers against a question's accepted answers.
+
+Accepted answers are normalised and compiled once (as part of the quiz's cached
+answer key), so grading a text answer is a dict lookup, a handful of precompiled
+regexes, and at most a bounded edit-distance check against answers of similar
+length.
+
+Regexes run on the submit path, so ``compile_pattern`` only accepts ones whose
+backtracking stays bounded: no nested quantifiers, no backreferences, and a
+capped product of the ways their quantifiers can split an answer.
+"""
+import re
+import unicodedata
+from re import _parser as sre_parse
+
+_WHITESPACE = re.compile(r'\s+')
+# Quotes around an answer and sentence punctuation after it; signs and symbols
+# ("-5", "C++", ".NET") are part of the answer and stay.
+_QUOTES = '"\'\u2018\u2019\u201c\u201d\u00ab\u00bb'
+_EDGE_PUNCTUATION = re.compile(rf'^[\s{_QUOTES}]+|[\s.,!?;:{_QUOTES}]+$')
+
+# Upper bound for Question.fuzzy_distance; keeps the fuzzy check cheap.
+MAX_FUZZY_DISTANCE = 3
+
+# Raw answers remembered per question; candidates tend to give the same few answers.
+MEMO_SIZE = 1024
+
+# Answers are cut to this many characters before they are graded.
+MAX_ANSWER_LENGTH = 300
+# Upper bound on a pattern's estimated backtracking (see ``pattern_cost``):
+# two open-ended quantifiers in a row fit, three do not.
+MAX_PATTERN_COST = 200000
+
+
+def normalize(text):
+    """Case-fold, strip accents, collapse whitespace and drop surrounding quotes and trailing punctuation."""
+    if text.isascii():
+        text = text.lower()
+    else:
+        text = unicodedata.normalize('NFKD', text.casefold())
+        text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    text = _WHITESPACE.sub(' ', text)
+    return _EDGE_PUNCTUATION.sub('', text)
+
+
+def fold_pattern(source):
+    """
+    Fold a regex's non-ASCII characters the way ``normalize`` folds answers, so
+    ``café`` matches the normalised ``cafe``. ASCII is left alone (escapes such
+    as ``\\W`` are case-sensitive); patterns are compiled case-insensitively.
+    """
+    if source.isascii():
+        return source
+    source = ''.join(ch if ch.isascii() else ch.casefold() for ch in source)
+    source = unicodedata.normalize('NFKD', source)
+    return ''.join(ch for ch in source if not unicodedata.combining(ch))
+
+
+class UnsafePattern(ValueError):
+    """A regex that could backtrack for too long on a submitted answer."""
+
+
+def pattern_cost(items):
+    """
+    Rough upper bound on the ways a parsed pattern can split an answer: the
+    product of each quantifier's choices and the sum over alternatives. Raises
+    ``UnsafePattern`` for nested quantifiers and backreferences, which have no bound.
+    """
+    cost = 1
+    for op, av in items:
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            low, high, body = av
+            inner = pattern_cost(body)
+            if high <= 1:
+                cost *= inner + high - low
+            elif inner > 1:
+                raise UnsafePattern("Nested quantifiers are not allowed; use a character class instead.")
+            else:
+                cost *= max(1, min(high, MAX_ANSWER_LENGTH) - low + 1)
+        elif op is sre_parse.POSSESSIVE_REPEAT:
+            cost *= pattern_cost(av[2])
+        elif op is sre_parse.ATOMIC_GROUP:
+            cost *= pattern_cost(av)
+        elif op is sre_parse.SUBPATTERN:
+            cost *= pattern_cost(av[3])
+        elif op is sre_parse.BRANCH:
+            cost *= sum(pattern_cost(branch) for branch in av[1])
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            cost *= pattern_cost(av[1])
+        elif op in (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS):
+            raise UnsafePattern("Backreferences are not allowed.")
+    return cost
+
+
+def compile_pattern(source):
+    """
+    Compile an accepted-answer regex for matching normalised answers. Raises
+    ``re.error`` for invalid patterns and ``UnsafePattern`` for unbounded ones.
+    """
+    source = fold_pattern(source)
+    pattern = re.compile(source, re.IGNORECASE)
+    if pattern_cost(sre_parse.parse(source, re.IGNORECASE)) > MAX_PATTERN_COST:
+        raise UnsafePattern("Pattern has too many quantifiers that can match the same text.")
+    return pattern
+
+
+def within_distance(a, b, limit):
+    """True if the Levenshtein distance between ``a`` and ``b`` is at most ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    if a == b:
+        return True
+
+    # Shared prefixes and suffixes never add edits; typos usually leave little else.
+    shortest = min(len(a), len(b))
+    prefix = 0
+    while prefix < shortest and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < shortest - prefix and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+    a = a[prefix:len(a) - suffix]
+    b = b[prefix:len(b) - suffix]
+    if len(a) > len(b):
+        a, b = b, a
+    if not a:
+        return len(b) <= limit
+
+    # Only cells within ``limit`` of the diagonal can stay under the bound.
+    big = limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        lo = max(1, i - limit)
+        hi = min(len(b), i + limit)
+        current = [big] * (len(b) + 1)
+        current[0] = i if i <= limit else big
+        row_min = current[0]
+        for j in range(lo, hi + 1):
+            cost = 0 if ca == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return False
+        previous = current
+    return previous[len(b)] <= limit
+
+
+class TextMatcher:
+    """
+    Compiled accepted answers for one text question.
+
+    ``answers`` is an iterable of ``(text, is_regex, weight)``; ``weight`` is the
+    fraction of the question's marks the answer is worth. Every accepted answer
+    acts as a synonym of the others; regexes must match the whole normalised answer.
+    """
+
+    __slots__ = ('exact', 'patterns', 'fuzzy', 'max_distance', '_memo')
+
+    def __init__(self, answers, max_distance=0):
+        self.exact = {}
+        self.patterns = []
+        self.fuzzy = []
+        self.max_distance = min(max_distance or 0, MAX_FUZZY_DISTANCE)
+        self._memo = {}
+        for text, is_regex, weight in answers:
+            weight = 1.0 if weight is None else float(weight)
+            if is_regex:
+                try:
+                    self.patterns.append((compile_pattern(text), weight))
+                except (re.error, UnsafePattern):
+                    # Saved before patterns were checked; never run it on the submit path.
+                    pass
+                continue
+            normalized = normalize(text)
+            if normalized and weight > self.exact.get(normalized, float('-inf')):
+                self.exact[normalized] = weight
+        if self.max_distance:
+            self.fuzzy = sorted(self.exact.items(), key=lambda item: -item[1])
+
+    def __bool__(self):
+        return bool(self.exact or self.patterns)
+
+    def match(self, text):
+        """Weight of the best accepted answer ``text`` matches, or ``None``."""
+        try:
+            return self._memo[text]
+        except KeyError:
+            pass
+        weight = self._match(text)
+        if len(self._memo) >= MEMO_SIZE:
+            self._memo.clear()
+        self._memo[text] = weight
+        return weight
+
+    def _match(self, text):
+        normalized = normalize(text)
+        if not normalized:
+            return None
+        weight = self.exact.get(normalized)
+        if weight is not None:
+            return weight
+        for pattern, pattern_weight in self.patterns:
+            if pattern.fullmatch(normalized):
+                return pattern_weight
+        limit = self.max_distance
+        for candidate, candidate_weight in self.fuzzy:
+            if within_distance(normalized, candidate, limit):
+                return candidate_weight
+        return None
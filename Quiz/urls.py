@@ -6,6 +6,18 @@ from .views import (
     QuizQuestionsAPIView,
     QuizSubmitAPIView,
     QuestionDetailAPIView,
+    QuizLeaderboardAPIView,
+    SubmissionRankAPIView,
+    QuizCloneAPIView,
+    QuizQuestionLinksAPIView,
+    QuestionBankListCreateAPIView,
+    BankQuestionsAPIView,
+    QuizSessionsAPIView,
+    ExamSessionDetailAPIView,
+    ExamSessionAnswersAPIView,
+    ExamSessionSubmitAPIView,
+    QuizRescoreAPIView,
+    RescoreJobDetailAPIView,
 )
 
 urlpatterns = [
@@ -15,7 +27,27 @@ urlpatterns = [
     path('quizzes/<uuid:quiz_id>/questions/', CreateQuestions.as_view(), name='quiz-questions-create'),
     path('quizzes/<uuid:quiz_id>/all-questions/', QuizQuestionsAPIView.as_view(), name='quiz-questions'),
     path('quizzes/<uuid:quiz_id>/submit/', QuizSubmitAPIView.as_view(), name='quiz-submit'),
+    path('quizzes/<uuid:quiz_id>/leaderboard/', QuizLeaderboardAPIView.as_view(), name='quiz-leaderboard'),
+    path('quizzes/<uuid:quiz_id>/clone/', QuizCloneAPIView.as_view(), name='quiz-clone'),
+    path('quizzes/<uuid:quiz_id>/links/', QuizQuestionLinksAPIView.as_view(), name='quiz-question-links'),
+    path('quizzes/<uuid:quiz_id>/sessions/', QuizSessionsAPIView.as_view(), name='quiz-sessions'),
+    path('quizzes/<uuid:quiz_id>/rescore/', QuizRescoreAPIView.as_view(), name='quiz-rescore'),
 
     # Question endpoints
     path('questions/<uuid:pk>/', QuestionDetailAPIView.as_view(), name='question-detail'),
+
+    # Question bank endpoints
+    path('banks/', QuestionBankListCreateAPIView.as_view(), name='bank-list-create'),
+    path('banks/<uuid:bank_id>/questions/', BankQuestionsAPIView.as_view(), name='bank-questions'),
+
+    # Exam session endpoints
+    path('sessions/<uuid:pk>/', ExamSessionDetailAPIView.as_view(), name='session-detail'),
+    path('sessions/<uuid:pk>/answers/', ExamSessionAnswersAPIView.as_view(), name='session-answers'),
+    path('sessions/<uuid:pk>/submit/', ExamSessionSubmitAPIView.as_view(), name='session-submit'),
+
+    # Rescore job endpoints
+    path('rescore-jobs/<uuid:pk>/', RescoreJobDetailAPIView.as_view(), name='rescore-job-detail'),
+
+    # Submission endpoints
+    path('submissions/<uuid:pk>/rank/', SubmissionRankAPIView.as_view(), name='submission-rank'),
 ]
@@ -1,18 +1,75 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from django.db import transaction
+from django.db.models import F, Prefetch, Sum
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 
-from .models import Quiz, Question, Option, Submission, SubmissionAnswer
+from .models import Quiz, Question, QuestionBank, QuizQuestion, Submission, Option, AcceptedAnswer, RescoreJob
+from . import detail_cache, exam_sessions, grading, leaderboard, rescoring
 from .serializers import (
     QuizSerializer,
     QuestionSerializer,
+    QuestionBankSerializer,
     PublicMCQQuestionSerializer,
+    QuestionLinksSerializer,
     SubmissionSerializer,
+    ExamSessionSerializer,
+    RescoreJobSerializer,
 )
-from uuid import UUID
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
+from .docs import swagger_auto_schema
+
+
+def linked_questions(quiz_id):
+    """Questions linked to a quiz, in quiz order, with options prefetched."""
+    return (
+        Question.objects.filter(quiz_links__quiz_id=quiz_id)
+        .annotate(position=F('quiz_links__order'))
+        .order_by(F('position').asc(nulls_last=True), 'quiz_links__id')
+        .prefetch_related('options')
+    )
+
+
+def load_quiz_detail(pk):
+    """One query: the serialized columns plus total marks summed in SQL."""
+    quiz = get_object_or_404(
+        Quiz.objects.only('id', 'title', 'instructions', 'created_at', 'bank_id', 'time_limit')
+        .annotate(marks_total=Sum('questions__marks')),
+        pk=pk,
+    )
+    return QuizSerializer(quiz).data, quiz.created_at
+
+
+def load_question_detail(pk):
+    """The question row plus one prefetch each for its options and accepted answers."""
+    question = get_object_or_404(
+        Question.objects.only(
+            'id', 'bank_id', 'text', 'type', 'order', 'created_at',
+            'marks', 'negative_marks', 'scoring', 'fuzzy_distance',
+        ).prefetch_related(
+            Prefetch('options', queryset=Option.objects.only('id', 'question_id', 'text', 'is_correct', 'weight')),
+            Prefetch('accepted_answers', queryset=AcceptedAnswer.objects.only(
+                'id', 'question_id', 'text', 'is_regex', 'weight'
+            )),
+        ),
+        pk=pk,
+    )
+    return QuestionSerializer(question).data, question.created_at
+
+
+def cached_detail(request, kind, pk, load):
+    """Serve a detail payload from ``detail_cache``; conditional GETs get a bodiless 304."""
+    data, etag, last_modified = detail_cache.fetch(kind, pk, load)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = Response(data, status=status.HTTP_200_OK)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True)
+    return response
+
 
 # ---------------- QUIZZES ----------------
 class QuizListCreateAPIView(APIView):
@@ -76,9 +133,10 @@ class CreateQuestions(APIView):
     def get(self, request, quiz_id):
         """List all questions for this quiz (hide correct answers)."""
         try:
-            quiz = get_object_or_404(Quiz, id=quiz_id)
-            questions = quiz.questions.prefetch_related("options").all()
-            serializer = PublicMCQQuestionSerializer(questions, many=True)
+            quiz = get_object_or_404(Quiz.objects.only('id'), id=quiz_id)
+            serializer = PublicMCQQuestionSerializer(
+                linked_questions(quiz.id), many=True, context={'quiz_id': quiz.id}
+            )
             return Response(serializer.data, status=status.HTTP_200_OK)
         
         except Exception as e:
@@ -93,9 +151,7 @@ class QuizDetailAPIView(APIView):
 
     def get(self, request, pk):
         try:
-            quiz = get_object_or_404(Quiz, pk=pk)
-            serializer = QuizSerializer(quiz)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return cached_detail(request, 'quiz', pk, load_quiz_detail)
         except Exception as e:
             return Response(
                 {"detail": str(e)},
@@ -106,9 +162,10 @@ class QuizQuestionsAPIView(APIView):
 
     def get(self, request, quiz_id):
         try:
-            quiz = get_object_or_404(Quiz, pk=quiz_id)
-            questions = quiz.questions.prefetch_related('options').all()
-            serializer = PublicMCQQuestionSerializer(questions, many=True)
+            quiz = get_object_or_404(Quiz.objects.only('id'), pk=quiz_id)
+            serializer = PublicMCQQuestionSerializer(
+                linked_questions(quiz.id), many=True, context={'quiz_id': quiz.id}
+            )
             return Response(serializer.data, status=status.HTTP_200_OK)
         except Exception as e:
             return Response(
@@ -122,44 +179,13 @@ class QuizSubmitAPIView(APIView):
 
     def post(self, request, quiz_id):
         try:
-            quiz = get_object_or_404(Quiz, pk=quiz_id)
+            quiz = get_object_or_404(Quiz.objects.only('id'), pk=quiz_id)
             answers_payload = request.data.get('answers', [])
 
-            total = quiz.total_marks
-            score = 0
-
-            submission = Submission.objects.create(quiz=quiz, total=total, score=0)
-
-            for ans in answers_payload:
-                qid = ans.get('question')
-                selected_ids = ans.get('selected_options', [])
-                text_answer = ans.get('text_answer', '')
-
-                question = get_object_or_404(Question, id=qid, quiz=quiz)
-                sub_ans = SubmissionAnswer.objects.create(submission=submission, question=question)
-
-                if question.type in [Question.SINGLE, Question.MULTIPLE]:
-                    # ✅ filter out invalid UUIDs
-                    valid_ids = []
-                    for sid in selected_ids:
-                        try:
-                            valid_ids.append(UUID(sid))
-                        except Exception:
-                            continue  
-                    options = Option.objects.filter(id__in=valid_ids, question=question)
-                    sub_ans.selected_options.set(options)
-
-                    correct_ids = set(question.options.filter(is_correct=True).values_list('id', flat=True))
-                    chosen_ids = set(options.values_list('id', flat=True))
-                    if correct_ids == chosen_ids:
-                        score += question.marks
-
-                else:  # text question
-                    sub_ans.text_answer = text_answer[:300]
-                    sub_ans.save()
-
-            submission.score = score
-            submission.save(update_fields=['score'])
+            # Graded entirely against the cached answer key; invalid option ids are
+            # dropped there and every row is written with a single bulk insert.
+            submission = grading.grade_and_save(quiz.id, answers_payload)
+            leaderboard.update_boards([submission])
 
             # Use serializer for consistent response
             serializer = SubmissionSerializer(submission)
@@ -177,9 +203,253 @@ class QuestionDetailAPIView(APIView):
 
     def get(self, request, pk):
         try:
-            question = get_object_or_404(Question, pk=pk)
-            serializer = QuestionSerializer(question)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return cached_detail(request, 'question', pk, load_question_detail)
+        except Exception as e:
+            return Response({"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# ---------------- LEADERBOARD ----------------
+class QuizLeaderboardAPIView(APIView):
+    """Top submissions for a quiz, served from the in-memory leaderboard."""
+
+    def get(self, request, quiz_id):
+        try:
+            get_object_or_404(Quiz, pk=quiz_id)
+            try:
+                limit = max(1, min(int(request.query_params.get('limit', 10)), 100))
+            except ValueError:
+                return Response({"detail": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+            board = leaderboard.top(quiz_id, limit)
+            data = [
+                {"rank": position, "submission": submission_id, "score": score, "submitted_at": submitted_at}
+                for position, submission_id, score, submitted_at in board
+            ]
+            return Response(data, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class SubmissionRankAPIView(APIView):
+    """Rank of a single submission within its quiz."""
+
+    def get(self, request, pk):
+        try:
+            submission = get_object_or_404(Submission.objects.only('id', 'quiz_id', 'score'), pk=pk)
+            position, out_of = leaderboard.standing(submission.quiz_id, submission.id)
+            return Response({
+                "submission": submission.id,
+                "quiz": submission.quiz_id,
+                "score": submission.score,
+                "rank": position,
+                "out_of": out_of,
+            }, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class QuizCloneAPIView(APIView):
+    """Clone a quiz for another cohort, sharing its questions instead of copying them."""
+
+    def post(self, request, quiz_id):
+        try:
+            source = get_object_or_404(Quiz, pk=quiz_id)
+            time_limit = request.data.get('time_limit', source.time_limit)
+            if time_limit is not None:
+                try:
+                    time_limit = int(time_limit)
+                except (TypeError, ValueError):
+                    time_limit = 0
+                if time_limit < 1:
+                    return Response({"detail": "time_limit must be a positive integer."},
+                                    status=status.HTTP_400_BAD_REQUEST)
+            with transaction.atomic():
+                clone = Quiz.objects.create(
+                    title=request.data.get('title') or source.title,
+                    instructions=request.data.get('instructions', source.instructions),
+                    time_limit=time_limit,
+                    bank_id=source.bank_id,
+                )
+                # Only the link rows are copied; questions, options and the compiled
+                # answer keys of their banks are shared with the source quiz.
+                QuizQuestion.objects.bulk_create(
+                    [
+                        QuizQuestion(quiz=clone, question_id=question_id, order=order)
+                        for question_id, order in source.question_links.values_list('question_id', 'order')
+                    ],
+                    batch_size=1000,
+                )
+            detail_cache.invalidate('quiz', clone.id)
+            return Response(QuizSerializer(clone).data, status=status.HTTP_201_CREATED)
+        except Exception as e:
+            return Response({"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class QuizQuestionLinksAPIView(APIView):
+    """Add bank questions to a quiz by linking them."""
+
+    @swagger_auto_schema(request_body=QuestionLinksSerializer)
+    def post(self, request, quiz_id):
+        """Link ``{"questions": [...]}``, or every question in the quiz's bank when omitted."""
+        try:
+            quiz = get_object_or_404(Quiz, pk=quiz_id)
+            serializer = QuestionLinksSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            question_ids = serializer.validated_data.get('questions')
+            if question_ids is None:
+                if quiz.bank_id is None:
+                    return Response({"detail": "Quiz has no question bank."}, status=status.HTTP_400_BAD_REQUEST)
+                questions = Question.objects.filter(bank_id=quiz.bank_id).order_by(
+                    F('order').asc(nulls_last=True), 'created_at'
+                )
+            else:
+                questions = Question.objects.filter(pk__in=question_ids)
+            rows = list(questions.values_list('id', 'order'))
+            if question_ids is not None and len(rows) != len(set(question_ids)):
+                return Response({"detail": "Unknown question id."}, status=status.HTTP_400_BAD_REQUEST)
+
+            QuizQuestion.objects.bulk_create(
+                [QuizQuestion(quiz=quiz, question_id=question_id, order=order) for question_id, order in rows],
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+            grading.invalidate_quiz_key(quiz.id)
+            detail_cache.invalidate('quiz', quiz.id)
+            return Response({"quiz": quiz.id, "linked": len(rows)}, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# ---------------- QUESTION BANKS ----------------
+class QuestionBankListCreateAPIView(APIView):
+    """Create a question bank or list all banks."""
+
+    def get(self, request):
+        try:
+            banks = QuestionBank.objects.all().order_by('-created_at')
+            return Response(QuestionBankSerializer(banks, many=True).data, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @swagger_auto_schema(request_body=QuestionBankSerializer, responses={201: QuestionBankSerializer})
+    def post(self, request):
+        try:
+            serializer = QuestionBankSerializer(data=request.data)
+            if serializer.is_valid():
+                bank = serializer.save()
+                return Response(QuestionBankSerializer(bank).data, status=status.HTTP_201_CREATED)
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class BankQuestionsAPIView(APIView):
+    """Create and list the questions of a bank (authoring view, includes answers)."""
+
+    def post(self, request, bank_id):
+        try:
+            bank = get_object_or_404(QuestionBank, pk=bank_id)
+            data = request.data.copy()
+            data['bank'] = str(bank.id)
+            data.pop('quiz', None)
+
+            serializer = QuestionSerializer(data=data)
+            if serializer.is_valid():
+                question = serializer.save()
+                return Response(QuestionSerializer(question).data, status=status.HTTP_201_CREATED)
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def get(self, request, bank_id):
+        try:
+            bank = get_object_or_404(QuestionBank, pk=bank_id)
+            questions = bank.questions.prefetch_related('options', 'accepted_answers').order_by(
+                F('order').asc(nulls_last=True), 'created_at'
+            )
+            return Response(QuestionSerializer(questions, many=True).data, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+
+# ---------------- EXAM SESSIONS ----------------
+class QuizSessionsAPIView(APIView):
+    """Start a timed attempt at a quiz."""
+
+    def post(self, request, quiz_id):
+        try:
+            quiz = get_object_or_404(Quiz.objects.only('id', 'time_limit'), pk=quiz_id)
+            session = exam_sessions.start(quiz)
+            return Response(ExamSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+        except Exception as e:
+            return Response({"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ExamSessionDetailAPIView(APIView):
+    """A session's status, time left and saved answers."""
+
+    def get(self, request, pk):
+        try:
+            session = exam_sessions.get_session(pk)
+            return Response(ExamSessionSerializer(session).data, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ExamSessionAnswersAPIView(APIView):
+    """Autosave answers; they are held in memory and written in periodic batches."""
+
+    def put(self, request, pk):
+        try:
+            session, saved = exam_sessions.autosave(pk, request.data.get('answers', []))
+            return Response({
+                "saved": saved,
+                "saved_at": session.saved_at,
+                "remaining_seconds": session.remaining_seconds,
+            }, status=status.HTTP_200_OK)
+        except exam_sessions.SessionClosed as e:
+            return Response({"detail": str(e)}, status=status.HTTP_409_CONFLICT)
+        except Exception as e:
+            return Response({"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ExamSessionSubmitAPIView(APIView):
+    """Submit a session; past the deadline only the answers saved in time are graded."""
+
+    def post(self, request, pk):
+        try:
+            session, submission = exam_sessions.submit(pk, request.data.get('answers'))
+            data = SubmissionSerializer(submission).data
+            data['session_status'] = session.status
+            return Response(data, status=status.HTTP_200_OK)
+        except exam_sessions.SessionClosed as e:
+            return Response({"detail": str(e)}, status=status.HTTP_409_CONFLICT)
+        except Exception as e:
+            return Response({"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# ---------------- RESCORING ----------------
+class QuizRescoreAPIView(APIView):
+    """Queue a rescore of a quiz's submissions after its answer key was corrected."""
+
+    def post(self, request, quiz_id):
+        """Jobs run in ``manage.py rescore_quiz --pending``; an unfinished job is returned instead of a new one."""
+        try:
+            quiz = get_object_or_404(Quiz.objects.only('id'), pk=quiz_id)
+            job = rescoring.create_job(quiz.id)
+            return Response(RescoreJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+        except Exception as e:
+            return Response({"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class RescoreJobDetailAPIView(APIView):
+    """Progress of a rescore job."""
+
+    def get(self, request, pk):
+        try:
+            job = get_object_or_404(RescoreJob, pk=pk)
+            return Response(RescoreJobSerializer(job).data, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
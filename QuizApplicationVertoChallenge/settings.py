@@ -80,12 +80,12 @@ WSGI_APPLICATION = 'QuizApplicationVertoChallenge.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'quiz',
+        'ENGINE': config('DB_ENGINE', default='django.db.backends.mysql'),
+        'NAME': config('DB_NAME', default='quiz'),
         'USER':  config('DB_USER', default=''),
         'PASSWORD':config('DB_PASSWORD', default=''),
-        'HOST': '127.0.0.1',  # Set to empty string for localhost.
-        'PORT': '3306',  # Set to empty string for default.
+        'HOST': config('DB_HOST', default='127.0.0.1'),  # Set to empty string for localhost.
+        'PORT': config('DB_PORT', default='3306'),  # Set to empty string for default.
     }
 }
 
@@ -137,4 +137,7 @@ REST_FRAMEWORK = {
 'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
 'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
 'PAGE_SIZE': 5, # paginate quizzes & other list views
-}
\ No newline at end of file
+}
+
+# Swagger / ReDoc under /swagger/ and /redoc/ (requires drf_yasg in INSTALLED_APPS).
+API_DOCS_ENABLED = True
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+Production settings for the JSON API.
+
+    DJANGO_SETTINGS_MODULE=QuizApplicationVertoChallenge.settings_production
+
+Builds on settings.py but only loads what a pure JSON API needs: no admin,
+sessions, messages, static files or templates, a two-entry middleware stack, and
+no Swagger/ReDoc unless API_DOCS_ENABLED=True. This cuts worker boot time and
+per-worker memory; `python -m benchmarks.startup` compares both profiles.
+"""
+
+from decouple import Csv, config
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES, REST_FRAMEWORK
+
+SECRET_KEY = config('SECRET_KEY')
+
+DEBUG = False
+
+ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='', cast=Csv())
+
+API_DOCS_ENABLED = config('API_DOCS_ENABLED', default=False, cast=bool)
+
+INSTALLED_APPS = [
+    'Quiz',
+    'rest_framework',
+]
+if API_DOCS_ENABLED:
+    # drf_yasg renders its UI from templates/static files.
+    INSTALLED_APPS += ['django.contrib.staticfiles', 'drf_yasg']
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'APP_DIRS': True,
+    },
+] if API_DOCS_ENABLED else []
+
+AUTH_PASSWORD_VALIDATORS = []
+
+# No auth apps are installed: requests are anonymous without loading django.contrib.auth.
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_AUTHENTICATION_CLASSES': [],
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.AllowAny'],
+    'UNAUTHENTICATED_USER': None,
+}
+
+# Answer keys, leaderboards and detail payloads are cached per worker and
+# invalidated through version counters kept in this cache, so every worker must
+# share it. The database cache needs `manage.py createcachetable`; point
+# CACHE_BACKEND/CACHE_LOCATION at Redis or Memcached where one is available.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': config('CACHE_LOCATION', default='quiz_cache'),
+    },
+}
+
+# Reuse database connections across requests instead of reconnecting every time.
+DATABASES = {
+    'default': {**DATABASES['default'], 'CONN_MAX_AGE': config('CONN_MAX_AGE', default=60, cast=int)},
+}
@@ -14,46 +14,75 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from functools import cache
+
+from django.apps import apps
+from django.conf import settings
 from django.urls import path, include, re_path
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Quiz API",
-        default_version="v1",
-        description="Online Quiz Application API for Verto Challenge",
-        terms_of_service="https://www.example.com/terms/",
-        contact=openapi.Contact(email="support@verto.com"),
-        license=openapi.License(name="MIT License"),
-    ),
-    public=True,
-    permission_classes=[permissions.AllowAny],
-)
 
-urlpatterns = [
-    # Admin
-    path("admin/", admin.site.urls),
 
+@cache
+def get_docs_schema_view():
+    # Built on the first docs request rather than at import time, so workers
+    # don't pay for drf_yasg's schema machinery unless someone opens the docs.
+    from rest_framework import permissions
+    from drf_yasg.views import get_schema_view
+    from drf_yasg import openapi
+
+    return get_schema_view(
+        openapi.Info(
+            title="Quiz API",
+            default_version="v1",
+            description="Online Quiz Application API for Verto Challenge",
+            terms_of_service="https://www.example.com/terms/",
+            contact=openapi.Contact(email="support@verto.com"),
+            license=openapi.License(name="MIT License"),
+        ),
+        public=True,
+        permission_classes=[permissions.AllowAny],
+    )
+
+
+def lazy_docs_view(renderer, *args, **kwargs):
+    """URL view that resolves ``get_docs_schema_view().<renderer>(...)`` on first use."""
+    @cache
+    def resolve():
+        return getattr(get_docs_schema_view(), renderer)(*args, **kwargs)
+
+    def view(request, *view_args, **view_kwargs):
+        return resolve()(request, *view_args, **view_kwargs)
+    return view
+
+
+urlpatterns = [
     # App routes
     path("api/", include("Quiz.urls")),
+]
+
+if apps.is_installed("django.contrib.admin"):
+    from django.contrib import admin
+
+    urlpatterns += [
+        # Admin
+        path("admin/", admin.site.urls),
+    ]
 
-    # Swagger & ReDoc
-    re_path(
-        r"^swagger(?P<format>\.json|\.yaml)$",
-        schema_view.without_ui(cache_timeout=0),
-        name="schema-json",
-    ),
-    path(
-        "swagger/",
-        schema_view.with_ui("swagger", cache_timeout=0),
-        name="schema-swagger-ui",
-    ),
-    path(
-        "redoc/",
-        schema_view.with_ui("redoc", cache_timeout=0),
-        name="schema-redoc",
-    ),
-]
\ No newline at end of file
+if getattr(settings, "API_DOCS_ENABLED", False):
+    urlpatterns += [
+        # Swagger & ReDoc
+        re_path(
+            r"^swagger(?P<format>\.json|\.yaml)$",
+            lazy_docs_view("without_ui", cache_timeout=0),
+            name="schema-json",
+        ),
+        path(
+            "swagger/",
+            lazy_docs_view("with_ui", "swagger", cache_timeout=0),
+            name="schema-swagger-ui",
+        ),
+        path(
+            "redoc/",
+            lazy_docs_view("with_ui", "redoc", cache_timeout=0),
+            name="schema-redoc",
+        ),
+    ]
\ No newline at end of file
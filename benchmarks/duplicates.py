@@ -0,0 +1,114 @@
+"""
+Duplicate-detection benchmark.
+
+    python -m benchmarks.duplicates --submissions 100000 --questions 50
+
+Builds signatures for synthetic submissions (no database involved): candidates
+answer independently, except for planted rings that copy a source submission and
+change a few answers. Answers are skewed the way real ones are: each question has
+its own difficulty, and wrong answers mostly go to one popular distractor (the
+first choice of each question is the right one). As in ``manage.py
+detect_duplicates``, only wrong answers are signed, and only submissions whose
+wrong answers are unlikely to coincide given how often each was given
+(``--ignore-shares`` signs every submission, for comparison). Then times ``find_clusters`` over all
+of them, which is what the command spends once the rows are signed and loaded,
+and reports how many of the planted rings were recovered and how many honest
+submissions were flagged.
+"""
+import argparse
+import collections
+import os
+import random
+import time
+import uuid
+
+# How the wrong answers to a question split between its three distractors.
+DISTRACTOR_WEIGHTS = (0.7, 0.2, 0.1)
+
+
+def build(options, rng):
+    from Quiz import similarity
+
+    questions = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(options.questions)]
+    choices = {question: [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(4)] for question in questions}
+    right_share = {question: rng.uniform(0.3, 0.95) for question in questions}
+
+    def answer(question):
+        if rng.random() < right_share[question]:
+            return choices[question][0]
+        return rng.choices(choices[question][1:], DISTRACTOR_WEIGHTS)[0]
+
+    def random_answers():
+        return {question: answer(question) for question in questions}
+
+    answer_sets = []
+    rings = []
+    for _ in range(options.rings):
+        source = random_answers()
+        ring = []
+        for _ in range(options.ring_size):
+            copy = dict(source)
+            for question in rng.sample(questions, options.changes):
+                copy[question] = answer(question)
+            ring.append(len(answer_sets))
+            answer_sets.append(copy)
+        rings.append(ring)
+    while len(answer_sets) < options.submissions:
+        answer_sets.append(random_answers())
+
+    started = time.perf_counter()
+    shares = similarity.NO_SHARES
+    if not options.ignore_shares:
+        picks = collections.Counter(option for answers in answer_sets for option in answers.values())
+        shares = similarity.AnswerShares(picks.items(), (), len(answer_sets))
+    rows = []
+    for index, answers in enumerate(answer_sets):
+        answer_hash, minhash = similarity.signature((
+            (question, [option], '') for question, option in answers.items() if option != choices[question][0]
+        ), shares)
+        rows.append((index, answer_hash, minhash))
+    return rows, rings, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.duplicates', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--submissions', type=int, default=100000)
+    parser.add_argument('--questions', type=int, default=50)
+    parser.add_argument('--rings', type=int, default=20, help='planted groups of copied submissions')
+    parser.add_argument('--ring-size', type=int, default=5)
+    parser.add_argument('--changes', type=int, default=3, help='answers each copy changes')
+    parser.add_argument('--threshold', type=float, default=None)
+    parser.add_argument('--ignore-shares', action='store_true',
+                        help='sign every submission, however common its wrong answers')
+    parser.add_argument('--seed', type=int, default=1)
+    options = parser.parse_args(argv)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.loadtest.settings')
+    import django
+    django.setup()
+    from Quiz import similarity
+
+    threshold = options.threshold or similarity.THRESHOLD
+    rows, rings, signing = build(options, random.Random(options.seed))
+    compared = sum(1 for _, _, minhash in rows if minhash is not None)
+    print(f'signatures: {len(rows)} in {signing:.2f} s ({signing / len(rows) * 1e6:.1f} us each), '
+          f'{compared} with evidence enough to compare')
+
+    started = time.perf_counter()
+    clusters = similarity.find_clusters(rows, threshold)
+    elapsed = time.perf_counter() - started
+
+    cluster_of = {member: n for n, cluster in enumerate(clusters) for member in cluster.submissions}
+    recovered = sum(
+        1 for ring in rings
+        if ring[0] in cluster_of and all(cluster_of.get(member) == cluster_of[ring[0]] for member in ring)
+    )
+    planted = {member for ring in rings for member in ring}
+    false_positives = sum(1 for member in cluster_of if member not in planted)
+    print(f'find_clusters: {elapsed:.2f} s, {len(clusters)} clusters at threshold {threshold}')
+    print(f'planted rings recovered whole: {recovered}/{len(rings)}, honest submissions flagged: {false_positives}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Micro-benchmark for the grading engine.
+
+    python -m benchmarks.grading --questions 500 --repeat 2000
+
+Builds a synthetic answer key (no database involved), then times grading a full
+submission payload against it. The numbers are pure Python time: what the submit
+endpoint spends scoring once the compiled key is cached. Text answers are
+memoised per question, so repeated runs measure the warm path for those.
+"""
+import argparse
+import os
+import random
+import statistics
+import timeit
+import uuid
+
+
+def build(question_count, seed):
+    from Quiz.grading import AnswerKey
+    from Quiz.models import Question
+
+    rng = random.Random(seed)
+    question_rows, option_rows, accepted_rows, answers = [], [], [], []
+    for n in range(question_count):
+        qid = uuid.UUID(int=rng.getrandbits(128))
+        kind = (Question.SINGLE, Question.MULTIPLE, Question.MULTIPLE, Question.TEXT)[n % 4]
+        scoring = Question.PARTIAL if kind == Question.MULTIPLE and n % 8 == 1 else Question.EXACT
+        question_rows.append((qid, kind, rng.choice((1, 2, 4)), rng.choice((0, 0.25)), scoring, 1))
+        if kind == Question.TEXT:
+            accepted_rows.append((qid, f'Answer number {n}', False, 1))
+            accepted_rows.append((qid, f'answer no\\.? ?{n}', True, 0.5))
+            # mix of exact hits, typos and misses
+            text = rng.choice((f'  answer NUMBER {n}.', f'answr number {n}', 'something else'))
+            answers.append({'question': str(qid), 'text_answer': text})
+            continue
+        options = [uuid.UUID(int=rng.getrandbits(128)) for _ in range(4)]
+        correct = {options[0]} if kind == Question.SINGLE else set(options[:2])
+        option_rows.extend((oid, qid, oid in correct, None) for oid in options)
+        picks = rng.sample(options, 1 if kind == Question.SINGLE else 2)
+        answers.append({'question': str(qid), 'selected_options': [str(oid) for oid in picks]})
+    return AnswerKey.from_rows(question_rows, option_rows, accepted_rows), answers
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.grading', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=2000, help='gradings per timing sample')
+    parser.add_argument('--samples', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    options = parser.parse_args(argv)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.loadtest.settings')
+    import django
+    django.setup()
+
+    compile_time = timeit.timeit(lambda: build(options.questions, options.seed), number=1)
+    key, answers = build(options.questions, options.seed)
+    samples = timeit.repeat(lambda: key.grade(answers), number=options.repeat, repeat=options.samples)
+    per_call = [sample / options.repeat * 1e6 for sample in samples]
+
+    graded = key.grade(answers)
+    print(f'questions: {options.questions}  score: {graded.score}/{graded.total}')
+    print(f'key build (incl. synthetic data): {compile_time * 1000:.2f} ms')
+    print(f'grade one submission: best {min(per_call):.1f} us, median {statistics.median(per_call):.1f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+Command-line entry point for the load-test harness.
+
+    python -m benchmarks.loadtest herd_fetch --users 10000 --concurrency 64
+    python -m benchmarks.loadtest staggered_submit --base-url http://127.0.0.1:8000
+    python -m benchmarks.loadtest compare before.json after.json
+
+Without ``--base-url`` the app runs in-process against a fresh SQLite database
+(see ``benchmarks.loadtest.settings``) and per-endpoint SQL query totals are
+reported; against a live server only HTTP-level metrics are available.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+from .scenarios import SCENARIOS
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_transport(options):
+    from .runner import HttpTransport, InProcessTransport
+
+    if options.base_url:
+        return HttpTransport(options.base_url)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.loadtest.settings')
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+
+    django.setup()
+    db_name = settings.DATABASES['default']['NAME']
+    if options.fresh_db and os.path.exists(db_name):
+        os.remove(db_name)
+    call_command('migrate', verbosity=0)
+    return InProcessTransport()
+
+
+def run(options):
+    from .runner import LoadRunner
+
+    scenario = SCENARIOS[options.scenario]
+    transport = build_transport(options)
+    runner = LoadRunner(transport, options.concurrency)
+    results = runner.run(scenario, options)
+
+    report = {
+        'scenario': scenario.name,
+        'description': scenario.description,
+        'transport': transport.name,
+        'revision': git_revision(),
+        'started_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'params': {
+            'users': options.users,
+            'concurrency': options.concurrency,
+            'questions': options.questions,
+            'window_s': options.window,
+            'seed': options.seed,
+        },
+        **results,
+    }
+    output = options.output or f"loadtest-{scenario.name}-{report['revision'] or 'local'}.json"
+    with open(output, 'w') as fh:
+        json.dump(report, fh, indent=2)
+
+    print_report(report)
+    print(f'\nSaved results to {output}')
+
+
+def print_report(report):
+    print(f"{report['scenario']} ({report['transport']}, rev {report['revision']}) in {report['elapsed_s']}s")
+    header = f"{'endpoint':48} {'reqs':>7} {'err%':>6} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>8}"
+    print(header)
+    print('-' * len(header))
+    rows = list(report['endpoints'].items()) + [('TOTAL', report['overall'])]
+    for label, stats in rows:
+        lat = stats['latency_ms']
+        print(
+            f"{label:48} {stats['requests']:>7} {stats['error_rate'] * 100:>6.2f} {stats['throughput_rps'] or 0:>9.1f} "
+            f"{lat['p50'] or 0:>9.2f} {lat['p95'] or 0:>9.2f} {lat['p99'] or 0:>9.2f} "
+            f"{'-' if stats['db_queries'] is None else stats['db_queries']:>8}"
+        )
+
+
+def compare(options):
+    with open(options.before) as fh:
+        before = json.load(fh)
+    with open(options.after) as fh:
+        after = json.load(fh)
+
+    print(f"{before['scenario']}: {before['revision']} -> {after['revision']}")
+    labels = sorted(set(before['endpoints']) | set(after['endpoints']))
+    for label in labels + ['TOTAL']:
+        old = before['overall'] if label == 'TOTAL' else before['endpoints'].get(label)
+        new = after['overall'] if label == 'TOTAL' else after['endpoints'].get(label)
+        if old is None or new is None:
+            print(f'{label:48} only in {"after" if old is None else "before"}')
+            continue
+        print(f'{label:48} ' + '  '.join(
+            f'{metric} {delta(old_value, new_value)}' for metric, old_value, new_value in (
+                ('p50', old['latency_ms']['p50'], new['latency_ms']['p50']),
+                ('p95', old['latency_ms']['p95'], new['latency_ms']['p95']),
+                ('rps', old['throughput_rps'], new['throughput_rps']),
+                ('queries/req', old['db_queries_per_request'], new['db_queries_per_request']),
+            )
+        ))
+
+
+def delta(old, new):
+    if old is None or new is None:
+        return 'n/a'
+    if not old:
+        return f'{old} -> {new}'
+    return f'{old} -> {new} ({(new - old) / old * 100:+.1f}%)'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.loadtest', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    for name, scenario in SCENARIOS.items():
+        p = sub.add_parser(name, help=scenario.description)
+        p.set_defaults(func=run, scenario=name)
+        p.add_argument('--users', type=int, default=1000, help='virtual candidates (default: 1000)')
+        p.add_argument('--concurrency', type=int, default=32, help='requests in flight at once (default: 32)')
+        p.add_argument('--questions', type=int, default=20, help='questions in the seeded quiz (default: 20)')
+        p.add_argument('--window', type=float, default=60.0, help='seconds over which submits are spread')
+        p.add_argument('--seed', type=int, default=1)
+        p.add_argument('--base-url', help='target a running server instead of the in-process app')
+        p.add_argument('--keep-db', dest='fresh_db', action='store_false',
+                       help='reuse the SQLite database from the previous in-process run')
+        p.add_argument('--output', '-o', help='where to write the JSON report')
+
+    p = sub.add_parser('compare', help='diff two saved JSON reports')
+    p.set_defaults(func=compare)
+    p.add_argument('before')
+    p.add_argument('after')
+
+    options = parser.parse_args(argv)
+    options.func(options)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+Transports, metrics and the asyncio driver for the load-test harness.
+
+Requests are blocking (Django's test client or urllib), so each one runs on a
+worker thread via ``asyncio.to_thread``; the event loop only schedules virtual
+users and enforces the concurrency limit.
+"""
+import asyncio
+import json
+import math
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Response:
+    __slots__ = ('status', 'data', 'queries')
+
+    def __init__(self, status, data, queries=None):
+        self.status = status
+        self.data = data
+        self.queries = queries
+
+
+class InProcessTransport:
+    """Calls the WSGI app directly through Django's test client, counting SQL queries."""
+
+    name = 'in-process'
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _client(self):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            from django.test import Client
+            client = self._local.client = Client(raise_request_exception=False)
+        return client
+
+    def request(self, method, path, payload=None):
+        from django.db import connection
+
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        client = self._client()
+        with connection.execute_wrapper(count):
+            if method == 'GET':
+                res = client.get(path)
+            else:
+                res = client.generic(method, path, json.dumps(payload or {}), content_type='application/json')
+        try:
+            data = json.loads(res.content) if res.content else None
+        except ValueError:
+            data = None
+        return Response(res.status_code, data, queries)
+
+    def close(self):
+        from django.db import connections
+        connections.close_all()
+
+
+class HttpTransport:
+    """Talks to a running server (e.g. ``manage.py runserver``) over HTTP."""
+
+    name = 'http'
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else None
+        req = urllib.request.Request(
+            self.base_url + path, data=body, method=method,
+            headers={'Content-Type': 'application/json', 'Accept': 'application/json'},
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as res:
+                status, raw = res.status, res.read()
+        except urllib.error.HTTPError as e:
+            status, raw = e.code, e.read()
+        try:
+            data = json.loads(raw) if raw else None
+        except ValueError:
+            data = None
+        return Response(status, data)
+
+    def close(self):
+        pass
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.queries = 0
+        self.queries_known = True
+
+    def add(self, latency, ok, queries):
+        self.latencies.append(latency)
+        if not ok:
+            self.errors += 1
+        if queries is None:
+            self.queries_known = False
+        else:
+            self.queries += queries
+
+    def summary(self, elapsed):
+        values = sorted(self.latencies)
+        count = len(values)
+        ms = lambda v: None if v is None else round(v * 1000, 3)  # noqa: E731
+        return {
+            'requests': count,
+            'errors': self.errors,
+            'error_rate': round(self.errors / count, 4) if count else 0.0,
+            'throughput_rps': round(count / elapsed, 2) if elapsed else None,
+            'latency_ms': {
+                'mean': ms(statistics.fmean(values)) if values else None,
+                'p50': ms(percentile(values, 50)),
+                'p90': ms(percentile(values, 90)),
+                'p95': ms(percentile(values, 95)),
+                'p99': ms(percentile(values, 99)),
+                'max': ms(values[-1]) if values else None,
+            },
+            'db_queries': self.queries if self.queries_known else None,
+            'db_queries_per_request': (
+                round(self.queries / count, 2) if self.queries_known and count else None
+            ),
+        }
+
+
+class LoadRunner:
+    """Runs requests for a scenario and aggregates metrics per endpoint label."""
+
+    def __init__(self, transport, concurrency):
+        self.transport = transport
+        self.concurrency = concurrency
+        self.stats = {}
+        self._semaphore = None
+
+    async def call(self, label, method, path, payload=None):
+        """Issue one measured request; ``label`` groups it in the report (e.g. a route pattern)."""
+        async with self._semaphore:
+            start = time.perf_counter()
+            try:
+                res = await asyncio.to_thread(self.transport.request, method, path, payload)
+            except Exception:
+                res = None
+            latency = time.perf_counter() - start
+        stats = self.stats.setdefault(f'{method} {label}', EndpointStats())
+        stats.add(latency, res is not None and res.status < 400, None if res is None else res.queries)
+        return res
+
+    def setup_call(self, method, path, payload=None):
+        """Unmeasured request used while seeding fixtures."""
+        res = self.transport.request(method, path, payload)
+        if res.status >= 400:
+            raise RuntimeError(f'{method} {path} failed during setup: {res.status} {res.data}')
+        return res.data
+
+    def run(self, scenario, options):
+        context = scenario.setup(self, options)
+
+        async def main():
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            loop = asyncio.get_running_loop()
+            loop.set_default_executor(ThreadPoolExecutor(max_workers=self.concurrency))
+            start = time.perf_counter()
+            await scenario.run(self, context, options)
+            return time.perf_counter() - start
+
+        try:
+            elapsed = asyncio.run(main())
+        finally:
+            self.transport.close()
+
+        total = EndpointStats()
+        for stats in self.stats.values():
+            total.latencies.extend(stats.latencies)
+            total.errors += stats.errors
+            total.queries += stats.queries
+            total.queries_known = total.queries_known and stats.queries_known
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'overall': total.summary(elapsed),
+            'endpoints': {label: stats.summary(elapsed) for label, stats in sorted(self.stats.items())},
+        }
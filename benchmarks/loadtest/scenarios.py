@@ -0,0 +1,134 @@
+"""
+Load-test scenarios.
+
+A scenario seeds whatever fixtures it needs through the API in ``setup`` (not
+measured) and then drives virtual users concurrently in ``run``. Endpoint labels
+use the route pattern rather than the concrete URL so runs aggregate per endpoint.
+"""
+import asyncio
+import random
+
+QUIZZES = '/api/quizzes/'
+ALL_QUESTIONS = '/api/quizzes/{id}/all-questions/'
+QUESTIONS = '/api/quizzes/{id}/questions/'
+SUBMIT = '/api/quizzes/{id}/submit/'
+
+
+def seed_quiz(runner, question_count, title='Load test quiz'):
+    """Create a quiz with a mix of single- and multiple-choice questions."""
+    quiz = runner.setup_call('POST', QUIZZES, {'title': title, 'instructions': 'Generated by benchmarks.loadtest'})
+    for n in range(question_count):
+        runner.setup_call('POST', QUESTIONS.format(id=quiz['id']), question_payload(n))
+    return quiz['id']
+
+
+def question_payload(n):
+    if n % 3 == 2:
+        return {
+            'text': f'Question {n}: pick all even numbers',
+            'type': 'multiple',
+            'order': n,
+            'options': [
+                {'text': '2', 'is_correct': True},
+                {'text': '3', 'is_correct': False},
+                {'text': '4', 'is_correct': True},
+                {'text': '5', 'is_correct': False},
+            ],
+        }
+    return {
+        'text': f'Question {n}: what is {n} + 1?',
+        'type': 'single',
+        'order': n,
+        'options': [
+            {'text': str(n + 1), 'is_correct': True},
+            {'text': str(n + 2), 'is_correct': False},
+            {'text': str(n), 'is_correct': False},
+        ],
+    }
+
+
+def random_answers(questions, rng):
+    """Answer every fetched question by picking one or two options at random."""
+    answers = []
+    for question in questions:
+        options = [opt['id'] for opt in question.get('options', [])]
+        if not options:
+            answers.append({'question': question['id'], 'text_answer': 'load test'})
+            continue
+        picks = 2 if question['type'] == 'multiple' else 1
+        answers.append({'question': question['id'], 'selected_options': rng.sample(options, min(picks, len(options)))})
+    return answers
+
+
+class Scenario:
+    name = None
+    description = ''
+
+    def setup(self, runner, options):
+        return {'quiz_id': seed_quiz(runner, options.questions)}
+
+    async def run(self, runner, context, options):
+        raise NotImplementedError
+
+
+class HerdFetch(Scenario):
+    name = 'herd_fetch'
+    description = 'Every candidate fetches the question list at the same instant (exam start).'
+
+    async def run(self, runner, context, options):
+        path = ALL_QUESTIONS.format(id=context['quiz_id'])
+        await asyncio.gather(*(
+            runner.call(ALL_QUESTIONS, 'GET', path) for _ in range(options.users)
+        ))
+
+
+class StaggeredSubmit(Scenario):
+    name = 'staggered_submit'
+    description = 'Herd fetch at exam start, then submissions spread uniformly over --window seconds.'
+
+    async def run(self, runner, context, options):
+        quiz_id = context['quiz_id']
+        rng = random.Random(options.seed)
+
+        async def candidate(delay):
+            res = await runner.call(ALL_QUESTIONS, 'GET', ALL_QUESTIONS.format(id=quiz_id))
+            questions = res.data if res is not None and isinstance(res.data, list) else []
+            await asyncio.sleep(delay)
+            await runner.call(SUBMIT, 'POST', SUBMIT.format(id=quiz_id), {'answers': random_answers(questions, rng)})
+
+        await asyncio.gather(*(
+            candidate(rng.uniform(0, options.window)) for _ in range(options.users)
+        ))
+
+
+class MixedAuthoring(Scenario):
+    name = 'mixed_authoring'
+    description = 'Candidates take the quiz while a tenth as many authors create quizzes and questions.'
+
+    async def run(self, runner, context, options):
+        quiz_id = context['quiz_id']
+        rng = random.Random(options.seed)
+
+        async def candidate(delay):
+            await asyncio.sleep(delay)
+            res = await runner.call(ALL_QUESTIONS, 'GET', ALL_QUESTIONS.format(id=quiz_id))
+            questions = res.data if res is not None and isinstance(res.data, list) else []
+            await runner.call(SUBMIT, 'POST', SUBMIT.format(id=quiz_id), {'answers': random_answers(questions, rng)})
+
+        async def author(delay):
+            await asyncio.sleep(delay)
+            res = await runner.call(QUIZZES, 'POST', QUIZZES, {'title': 'Authored during load'})
+            if res is None or res.status >= 400:
+                return
+            for n in range(3):
+                await runner.call(QUESTIONS, 'POST', QUESTIONS.format(id=res.data['id']), question_payload(n))
+            await runner.call(QUIZZES, 'GET', QUIZZES)
+
+        authors = max(1, options.users // 10)
+        await asyncio.gather(
+            *(candidate(rng.uniform(0, options.window)) for _ in range(options.users)),
+            *(author(rng.uniform(0, options.window)) for _ in range(authors)),
+        )
+
+
+SCENARIOS = {scenario.name: scenario for scenario in (HerdFetch(), StaggeredSubmit(), MixedAuthoring())}
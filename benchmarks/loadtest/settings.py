@@ -0,0 +1,28 @@
+"""
+Settings for running the load-test harness in-process against SQLite.
+
+Everything comes from the project settings except the database, which points
+at a throwaway SQLite file so runs never touch the MySQL development database.
+"""
+import os
+import tempfile
+
+from QuizApplicationVertoChallenge.settings import *  # noqa: F401,F403
+
+DEBUG = False
+ALLOWED_HOSTS = ['*']
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('LOADTEST_DB', os.path.join(tempfile.gettempdir(), 'quiz-loadtest.sqlite3')),
+        # Writers queue on SQLite's lock instead of failing: IMMEDIATE avoids the
+        # read-to-write upgrade deadlock inside atomic blocks, WAL lets reads
+        # proceed while a submit is writing.
+        'OPTIONS': {
+            'timeout': 30,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': 'PRAGMA journal_mode=WAL;',
+        },
+    }
+}
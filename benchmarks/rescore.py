@@ -0,0 +1,86 @@
+"""
+Rescoring benchmark.
+
+    python -m benchmarks.rescore --submissions 20000 --questions 50 --workers 1 4
+
+Seeds a throwaway SQLite database with one quiz and its submissions, flips the
+correct option of the first question (the answer-key fix), then times a full
+rescore job for each worker count.
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def seed(question_count, submission_count, rng):
+    from Quiz import grading
+    from Quiz.models import Option, Quiz
+
+    quiz = Quiz.objects.create(title='Rescore benchmark')
+    questions = []
+    for n in range(question_count):
+        question = quiz.add_question(text=f'Question {n}', type='single')
+        options = Option.objects.bulk_create(
+            [Option(question=question, text=str(i), is_correct=i == 0) for i in range(4)]
+        )
+        questions.append((question, options))
+    grading.invalidate_bank_key(quiz.bank_id)
+
+    key = grading.get_answer_key(quiz.id)
+    for start in range(0, submission_count, 1000):
+        grading.save_submissions([
+            (quiz.id, key.grade([
+                {'question': str(question.id), 'selected_options': [str(rng.choice(options).id)]}
+                for question, options in questions
+            ]))
+            for _ in range(min(1000, submission_count - start))
+        ])
+    return quiz, questions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.rescore', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--submissions', type=int, default=20000)
+    parser.add_argument('--questions', type=int, default=50)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1)
+    options = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({
+            'DJANGO_SETTINGS_MODULE': 'QuizApplicationVertoChallenge.settings',
+            'DB_ENGINE': 'django.db.backends.sqlite3',
+            'DB_NAME': os.path.join(tmp, 'rescore.sqlite3'),
+        })
+        subprocess.run([sys.executable, 'manage.py', 'migrate', '-v', '0'], check=True)
+        import django
+        django.setup()
+        from Quiz import rescoring
+        from Quiz.models import Option, Submission
+
+        started = time.perf_counter()
+        quiz, questions = seed(options.questions, options.submissions, random.Random(options.seed))
+        print(f'seeded {options.submissions} submissions x {options.questions} answers '
+              f'in {time.perf_counter() - started:.1f} s')
+
+        first_options = questions[0][1]
+        Option.objects.filter(pk=first_options[0].pk).update(is_correct=False)
+        Option.objects.filter(pk=first_options[1].pk).update(is_correct=True)
+
+        for workers in options.workers:
+            Submission.objects.filter(quiz=quiz).update(score=0)
+            started = time.perf_counter()
+            job = rescoring.run(rescoring.create_job(quiz.id), workers=workers, chunk_size=options.chunk_size)
+            elapsed = time.perf_counter() - started
+            print(f'workers={workers}: {job.processed} rescored, {job.changed} changed in {elapsed:.2f} s '
+                  f'({job.processed / elapsed:.0f} submissions/s)')
+
+
+if __name__ == '__main__':
+    main()
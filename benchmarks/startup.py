@@ -0,0 +1,138 @@
+"""
+Worker cold-start benchmark.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --settings QuizApplicationVertoChallenge.settings_production --runs 10 -o startup.json
+
+Each run starts a fresh interpreter, as a new worker would, and measures:
+
+* boot: ``django.setup()`` plus building the WSGI app and URLconf
+* first request: the first ``GET`` through the WSGI app (default ``/api/quizzes/``)
+* RSS: resident memory after the first request, and the number of modules loaded
+
+Both runs use a throwaway SQLite database so the numbers don't depend on MySQL.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROFILES = [
+    'QuizApplicationVertoChallenge.settings',
+    'QuizApplicationVertoChallenge.settings_production',
+]
+
+
+def rss_kb():
+    try:
+        with open('/proc/self/status') as fh:
+            for line in fh:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def child(path):
+    """Runs inside the fresh interpreter; prints one JSON line of measurements."""
+    start = time.perf_counter()
+    import django
+    django.setup()
+    from django.core.wsgi import get_wsgi_application
+    from django.urls import get_resolver
+    application = get_wsgi_application()
+    get_resolver().url_patterns
+    booted = time.perf_counter()
+
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+        'wsgi.url_scheme': 'http', 'wsgi.input': open(os.devnull, 'rb'), 'wsgi.errors': sys.stderr,
+    }
+    status = []
+    body = b''.join(application(environ, lambda s, headers, exc_info=None: status.append(s)))
+    served = time.perf_counter()
+
+    print(json.dumps({
+        'boot_ms': (booted - start) * 1000,
+        'first_request_ms': (served - booted) * 1000,
+        'rss_kb': rss_kb(),
+        'modules': len(sys.modules),
+        'status': status[0] if status else None,
+        'bytes': len(body),
+    }))
+
+
+def run_profile(settings, options, env):
+    runs = []
+    for _ in range(options.runs):
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.startup', '--child', '--path', options.path],
+            env={**env, 'DJANGO_SETTINGS_MODULE': settings}, capture_output=True, text=True, check=True,
+        )
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        result['process_ms'] = (time.perf_counter() - started) * 1000
+        runs.append(result)
+
+    def median(field):
+        return round(statistics.median(r[field] for r in runs), 2)
+
+    return {
+        'settings': settings,
+        'status': runs[-1]['status'],
+        'boot_ms': median('boot_ms'),
+        'first_request_ms': median('first_request_ms'),
+        'process_ms': median('process_ms'),
+        'rss_kb': median('rss_kb'),
+        'modules': median('modules'),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.startup', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--settings', action='append', help='settings module(s) to compare (default: both profiles)')
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per profile (median is reported)')
+    parser.add_argument('--path', default='/api/quizzes/', help='path for the first request')
+    parser.add_argument('--output', '-o', help='write results as JSON')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    options = parser.parse_args(argv)
+
+    if options.child:
+        child(options.path)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            'DB_ENGINE': 'django.db.backends.sqlite3',
+            'DB_NAME': os.path.join(tmp, 'startup.sqlite3'),
+            'SECRET_KEY': os.environ.get('SECRET_KEY', 'startup-benchmark'),
+            'ALLOWED_HOSTS': 'localhost',
+        }
+        subprocess.run(
+            [sys.executable, 'manage.py', 'migrate', '-v', '0'],
+            env={**env, 'DJANGO_SETTINGS_MODULE': PROFILES[0]}, check=True,
+        )
+        results = [run_profile(settings, options, env) for settings in options.settings or PROFILES]
+
+    print(f"{'settings':52} {'boot ms':>9} {'1st req ms':>11} {'process ms':>11} {'RSS MB':>8} {'modules':>8}")
+    for r in results:
+        print(f"{r['settings']:52} {r['boot_ms']:>9.1f} {r['first_request_ms']:>11.1f} {r['process_ms']:>11.1f} "
+              f"{r['rss_kb'] / 1024:>8.1f} {r['modules']:>8.0f}  {r['status']}")
+
+    if options.output:
+        with open(options.output, 'w') as fh:
+            json.dump({'path': options.path, 'runs': options.runs, 'results': results}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()